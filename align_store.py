@@ -0,0 +1,118 @@
+import hashlib
+import json
+import sqlite3
+
+from grid_align import normalize_alignment
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Persistent grid‐alignment results, shared across runs of the heal scripts.
+#   A row is keyed by the input PNG's content hash, the grid mask(s) it was
+#   aligned against and the alignment settings, so re‐running a year with a
+#   different INPAINT_RADIUS / DILATE_PIXELS / THICKEN_PIXELS reuses θ, dx, dy
+#   instead of searching again.  SQLite in WAL mode, so parallel workers can
+#   share one file.  Shifts are also kept normalised to the frame size (u, v;
+#   grid_align.normalize_alignment) so the full‐resolution .tiff/.raw scans can
+#   reuse a preview's alignment without searching at 36× the pixel count.
+# ───────────────────────────────────────────────────────────────────────────────
+
+STORE_NAME = "alignment_params.sqlite"
+
+
+def file_digest(path, chunk=1 << 20):
+    """sha1 of a file's bytes."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def mask_digest(*masks):
+    """sha1 over the shape and pixels of one or more grid masks."""
+    h = hashlib.sha1()
+    for m in masks:
+        h.update(repr(m.shape).encode())
+        h.update(m.tobytes())
+    return h.hexdigest()
+
+
+def settings_key(**settings):
+    """Canonical string for the alignment settings a result depends on."""
+    return json.dumps(settings, sort_keys=True)
+
+
+class AlignmentStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS alignments (
+                   file_hash TEXT NOT NULL,
+                   mask_id   TEXT NOT NULL,
+                   settings  TEXT NOT NULL,
+                   theta     REAL NOT NULL,
+                   dx        REAL NOT NULL,
+                   dy        REAL NOT NULL,
+                   score     INTEGER NOT NULL,
+                   subpoint  TEXT,
+                   frame     TEXT,
+                   u         REAL,
+                   v         REAL,
+                   PRIMARY KEY (file_hash, mask_id, settings))"""
+        )
+        cols = {row[1] for row in self.conn.execute("PRAGMA table_info(alignments)")}
+        for col in ("u", "v"):
+            if col not in cols:  # store written before u/v existed
+                self.conn.execute(f"ALTER TABLE alignments ADD COLUMN {col} REAL")
+        self.conn.commit()
+
+    def get(self, file_hash, mask_id, settings):
+        """Returns (θ, dx, dy, score, subpoint) or None."""
+        row = self.conn.execute(
+            "SELECT theta, dx, dy, score, subpoint FROM alignments "
+            "WHERE file_hash = ? AND mask_id = ? AND settings = ?",
+            (file_hash, mask_id, settings),
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def find(self, file_hash, candidates=None):
+        """
+        Most recent (θ, u, v, subpoint) stored for this input, or None.  Used
+        to carry a preview's alignment over to its full‐resolution scan.
+        candidates = {subpoint: mask_ids} keeps only rows that can be replayed
+        onto one of those masks: a subpoint among the keys, aligned against
+        one of its mask_ids.  None takes any mask or settings.
+        """
+        where, args = "file_hash = ? AND u IS NOT NULL", [file_hash]
+        if candidates is not None:
+            pairs = [(sub, mid) for sub, ids in candidates.items() for mid in ids]
+            if not pairs:
+                return None
+            where += " AND subpoint IS NOT NULL AND (" + \
+                " OR ".join("(subpoint = ? AND mask_id = ?)" for _ in pairs) + ")"
+            args += [x for pair in pairs for x in pair]
+        row = self.conn.execute(
+            f"SELECT theta, u, v, subpoint FROM alignments WHERE {where} "
+            "ORDER BY rowid DESC LIMIT 1",
+            args,
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, file_hash, mask_id, settings, theta, dx, dy, score,
+            subpoint=None, frame=None, shape=None):
+        """shape: the aligned frame's shape, to also store the normalised u, v."""
+        u = v = None
+        if shape is not None:
+            _, u, v = normalize_alignment(theta, dx, dy, shape)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO alignments "
+            "(file_hash, mask_id, settings, theta, dx, dy, score, subpoint, frame, u, v) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (file_hash, mask_id, settings, float(theta), float(dx), float(dy),
+             int(score), subpoint, frame, u, v),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
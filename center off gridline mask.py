@@ -4,8 +4,9 @@ import json
 import glob
 import numpy as np
 from datetime import date, timedelta
-from rembg import remove, new_session
-from PIL import Image
+import rembg_service
+import rembg_matte
+from green_fill import green_fill
 
 # ───────────────────────────────────────────────────────────────────────────────
 #                          U S E R   CONFIGURATION
@@ -31,7 +32,12 @@ GREEN          = np.array((0, 255, 0), dtype=np.uint8)
 
 # Background removal
 USE_REMBG      = True    # remove background before alignment
-REMBG_SESSION  = new_session("unet")
+REMBG_SERVICE  = None    # e.g. rembg_service.ADDRESS: share one model with other runs (rembg_service.py)
+REMBG_SESSION  = rembg_service.session("unet", REMBG_SERVICE)
+REMBG_SCALE    = 1.0     # run rembg on a copy this size, upsample the matte (rembg_matte.py)
+REMBG_REFINE   = False   # re‐threshold the upsampled matte's edge at full resolution
+MATTE_METHOD   = "rembg" # "geometric": fit the limb ellipse (disk_segment.py), rembg only if the fit is poor
+MATTE_CACHE_DIR = None  # e.g. os.path.join(OUTPUT_ROOT, ".matte_cache"): reuse mattes of identical frames across runs
 
 # Dates & Sat info
 MAIN_SAT       = "32A"   # primary satellite code
@@ -44,6 +50,7 @@ FOURCC         = cv2.VideoWriter_fourcc(*'mp4v')
 
 # Flags
 RECENTER_DISK  = False   # recenter Earth disk after alignment
+GREEN_FILL_MODE= "iterative"  # green_fill.py: "iterative" (legacy passes) or "distance" (single pass)
 SAVE_DEBUG     = True    # save per‐frame debug images
 SAVE_FULL_DEBUG= False   # save every θ‐rotated mask image
 
@@ -180,31 +187,6 @@ def match_grid_to_satellite(sat_thresh, grid_mask, frame_name, y_off):
 
     return (*best_params, best_score)
 
-def fill_green_once(img, green_mask):
-    h, w = green_mask.shape
-    out = img.copy()
-    changed = False
-    neigh = [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(-1,1),(1,-1),(1,1)]
-    ys, xs = np.where(green_mask)
-    for y, x in zip(ys, xs):
-        vals = []
-        for dy, dx in neigh:
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w and not green_mask[ny, nx]:
-                vals.append(img[ny, nx])
-        if vals:
-            out[y, x] = np.mean(vals, axis=0).astype(np.uint8)
-            changed = True
-    return out, changed
-
-def recursive_green_fill(img):
-    while True:
-        green_mask = np.all(img == GREEN, axis=2)
-        if not green_mask.any(): break
-        img, chg = fill_green_once(img, green_mask)
-        if not chg: break
-    return img
-
 # ───────────────────────────────────────────────────────────────────────────────
 #                 Main pipeline: alignment + outputs creation
 # ───────────────────────────────────────────────────────────────────────────────
@@ -215,9 +197,9 @@ mh, mw = grid_mask.shape
 
 # Helper to remove background via rembg (returns RGBA numpy)
 def remove_background(img_bgr):
-    pil = Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
-    rem = remove(pil, session=REMBG_SESSION).convert("RGBA")
-    return np.array(rem)
+    return rembg_matte.remove_background(img_bgr, REMBG_SESSION, REMBG_SCALE, REMBG_REFINE, MATTE_METHOD)
+
+rembg_matte.set_matte_cache(MATTE_CACHE_DIR)
 
 # Process all dates
 for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
@@ -292,14 +274,14 @@ for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
         cv2.imwrite(out_green_path, aligned_green)
 
         # ── Create “no gridlines” = recursive‐green‐fill on aligned_green
-        filled = recursive_green_fill(aligned_green.copy())
+        filled = green_fill(aligned_green.copy(), GREEN_FILL_MODE)
         out_no_grid_path = os.path.join(OS_FOLDERS["folder_aligned_no_grid"], basefn + ".png")
         cv2.imwrite(out_no_grid_path, filled)
 
         # ── For “no background, inpainted” video: apply green‐fill to aligned_nobg
         aligned_nobg_green = aligned_nobg.copy()
         aligned_nobg_green[thick_mask > 0] = GREEN
-        nobg_filled = recursive_green_fill(aligned_nobg_green.copy())
+        nobg_filled = green_fill(aligned_nobg_green.copy(), GREEN_FILL_MODE)
         vid_no_bg_inpainted.write(nobg_filled)
 
         # ── Save “no grid, no background” frame
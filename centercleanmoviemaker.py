@@ -3,6 +3,7 @@ import numpy as np
 import cv2 as cv
 import os
 from datetime import date, timedelta
+from green_fill import fill_green_once
 
 def parse_ddd_to_date(year, doy):
     try:
@@ -26,34 +27,6 @@ def find_ON(data):
     return None
 
 
-# a function that, given the image and green‐mask, does one pass:
-def fill_green_once(shifted, green_mask):
-    h, w = green_mask.shape
-    # prepare a new image to write into
-    out = shifted.copy()
-    changed = False
-
-    # offsets for 8-neighbours
-    neigh = [(-1, 0), (+1, 0), (0, -1), (0, +1), (-1, -1), (-1, +1), (1, -1), (1, 1)]
-
-    # get coords of all green pixels
-    ys, xs = np.where(green_mask)
-    for (y, x) in zip(ys, xs):
-        vals = []
-        for dy, dx in neigh:
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w:
-                if not green_mask[ny, nx]:
-                    vals.append(shifted[ny, nx])
-        if vals:
-            # compute mean of neighbours (axis=0 over [B,G,R])
-            avg = np.mean(vals, axis=0).astype(np.uint8)
-            out[y, x] = avg
-            changed = True
-
-    return out, changed
-
-
 year = 1976
 start_day = 183
 satellite = "32A"
@@ -5,6 +5,7 @@ import os
 from datetime import date, timedelta
 from rembg import remove, new_session
 from PIL import Image
+from green_fill import fill_green_once
 
 def parse_ddd_to_date(year, doy):
     d = date(year, 1, 1) + timedelta(days=doy - 1)
@@ -22,22 +23,6 @@ def find_ON(data):
             return ln["boundingPolygon"][0]
     return None
 
-def fill_green_once(shifted, green_mask):
-    h,w = green_mask.shape
-    out = shifted.copy(); changed=False
-    neigh = [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(-1,1),(1,-1),(1,1)]
-    ys,xs = np.where(green_mask)
-    for y,x in zip(ys,xs):
-        vals=[]
-        for dy,dx in neigh:
-            ny,nx = y+dy, x+dx
-            if 0<=ny<h and 0<=nx<w and not green_mask[ny,nx]:
-                vals.append(shifted[ny,nx])
-        if vals:
-            out[y,x] = np.mean(vals,axis=0).astype(np.uint8)
-            changed=True
-    return out,changed
-
 # ───────── setup ─────────
 year, start_day = 1976, 183
 sat, alt = "32A","22A"
@@ -2,6 +2,7 @@ import os
 import glob
 import cv2
 import numpy as np
+from composite_stream import accumulate
 
 # ───────────────────────────────────────────────────────────────────────────────
 # USER–CONFIGURATION (SHAPE FILTERING LOGIC)
@@ -39,10 +40,8 @@ def main():
     if not paths:
         raise RuntimeError(f"No images found in {INPUT_DIR} matching {GLOB_PATTERN}")
 
-    imgs_color = [cv2.imread(p, cv2.IMREAD_COLOR) for p in paths]
-
     print("2) Creating a clean composite image...")
-    clean_composite_color = create_simple_composite(imgs_color)
+    clean_composite_color = create_simple_composite(paths)
     cv2.imwrite(OUT_FILE_COMPOSITE, clean_composite_color)
     print(f"   -> Clean composite saved to {OUT_FILE_COMPOSITE}")
 
@@ -93,13 +92,10 @@ def main():
     print(f"   -> Overlay image saved to {OUT_FILE_OVERLAY}")
 
 
-def create_simple_composite(imgs_color):
-    """Creates a simple average of all images."""
-    accumulator = np.zeros(imgs_color[0].shape, dtype=np.float64)
-    for img in imgs_color:
-        accumulator += img.astype(np.float64)
-    avg_img = accumulator / len(imgs_color)
-    return avg_img.astype(np.uint8)
+def create_simple_composite(paths):
+    """Creates a simple average of all images, reading one at a time."""
+    # Every pixel counts as bright above −1, so this is the plain mean
+    return accumulate(paths, th=-1).average()
 
 
 def create_overlay(background_img, mask):
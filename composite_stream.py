@@ -0,0 +1,155 @@
+import multiprocessing as mp
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Out‐of‐core composite for comp_maker.py / comp_maker_gem.py.  Frames are
+#   read once each and folded into running per‐pixel statistics of their
+#   "bright" pixels (gray > th): count, colour sum, gray min / max and, if
+#   asked, gray sum / sum of squares for the std, so memory is a few
+#   accumulators of frame size however many frames there are, instead of the
+#   (N, H, W) stacks.
+#
+#   Sums are exact integers, so the average is the floor division comp_maker's
+#   float mean truncated to, and keep / avg come out bit‐identical to it; the
+#   std is taken from the exact n·Σg² − (Σg)², so it doesn't depend on frame
+#   order either.
+#
+#   With workers > 1 the path list is cut into contiguous shards, one task
+#   per shard; each worker decodes only its shard's frames into its own
+#   full‐frame accumulator, and the parent merges them in shard order
+#   (CompositeAccumulator.merge).  Every frame is still decoded once, at the
+#   cost of one accumulator per worker in flight (~70 MB at 2000×2000, twice
+#   that with variance).  All the statistics are integers, so the merged
+#   result is bit‐identical to a single process.
+# ───────────────────────────────────────────────────────────────────────────────
+
+SHARDS = None            # frame shards for workers > 1 (None: one per worker)
+
+
+class CompositeAccumulator:
+    """Running statistics of the bright pixels of a (band of a) frame stack."""
+
+    def __init__(self, shape, th, variance=False):
+        h, w = shape
+        self.th = th
+        self.n = 0
+        self.count = np.zeros((h, w), np.uint32)
+        self.sum = np.zeros((h, w, 3), np.uint32)   # ≤ 16.8 M frames of 255
+        self.gmin = np.full((h, w), 255, np.uint8)
+        self.gmax = np.zeros((h, w), np.uint8)
+        self.gsum = np.zeros((h, w), np.uint64) if variance else None
+        self.gsq = np.zeros((h, w), np.uint64) if variance else None
+
+    def add(self, img_bgr):
+        gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+        bright = gray > self.th
+        self.n += 1
+        self.count += bright
+        self.sum += img_bgr * bright[..., None]
+        np.minimum(self.gmin, np.where(bright, gray, 255), out=self.gmin)
+        np.maximum(self.gmax, np.where(bright, gray, 0), out=self.gmax)
+        if self.gsum is not None:
+            g = np.where(bright, gray, 0).astype(np.uint64)
+            self.gsum += g
+            self.gsq += g * g
+
+    def merge(self, other):
+        """Folds in the statistics of another accumulator over the same pixels."""
+        if self.gsum is not None:
+            self.gsum += other.gsum
+            self.gsq += other.gsq
+        self.n += other.n
+        self.count += other.count
+        self.sum += other.sum
+        np.minimum(self.gmin, other.gmin, out=self.gmin)
+        np.maximum(self.gmax, other.gmax, out=self.gmax)
+        return self
+
+    def average(self):
+        """Per‐channel mean of the bright samples, floor‐divided, uint8."""
+        c = np.maximum(self.count, 1)[..., None]
+        return (self.sum // c).astype(np.uint8)
+
+    def spread(self):
+        """gmax − gmin of the bright samples (0 where there were none)."""
+        return np.where(self.count > 0, self.gmax.astype(np.int16) - self.gmin, 0)
+
+    def std(self):
+        """Population std of the bright gray samples (needs variance=True)."""
+        c = self.count.astype(np.uint64)
+        n_m2 = c * self.gsq - self.gsum * self.gsum     # n²·var, exact and ≥ 0
+        return np.sqrt(n_m2.astype(np.float64)) / np.maximum(c, 1)
+
+    def keep(self, min_frac, max_delta=None, max_std=None):
+        """
+        comp_maker's keep mask: bright in ≥ ceil(min_frac · n) frames and
+        stable — gray range ≤ max_delta, or std ≤ max_std if that's given.
+        """
+        enough = self.count >= int(np.ceil(min_frac * self.n))
+        if max_std is not None:
+            stable = self.std() <= max_std
+        else:
+            stable = self.spread() <= max_delta
+        return enough & stable & (self.count > 0)
+
+    def composite(self, min_frac, max_delta=None, max_std=None):
+        """Average colour where keep(), black elsewhere."""
+        out = self.average()
+        out[~self.keep(min_frac, max_delta, max_std)] = 0
+        return out
+
+
+def _read(path):
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise RuntimeError(f"Could not load {path}")
+    return img
+
+
+def accumulate(paths, th, variance=False, rows=None, shape=None):
+    """One CompositeAccumulator over paths, optionally only rows = (y0, y1)."""
+    acc = None
+    for p in paths:
+        img = _read(p)
+        if shape is None:
+            shape = img.shape[:2]
+        if img.shape[:2] != shape:
+            raise RuntimeError("All images must have the same dimensions")
+        if rows is not None:
+            img = img[rows[0]:rows[1]]
+        if acc is None:
+            acc = CompositeAccumulator(img.shape[:2], th, variance)
+        acc.add(img)
+    return acc
+
+
+def _shard(args):
+    paths, th, variance, shape = args
+    return accumulate(paths, th, variance, shape=shape)
+
+
+def composite_from_paths(paths, th, min_frac, max_delta=None, max_std=None,
+                         workers=1, shards=SHARDS):
+    """
+    Streams paths once and returns (composite, keep, accumulator); with
+    workers > 1 the frames are split into shards whose accumulators are
+    merged.
+    """
+    if not paths:
+        raise RuntimeError("No images to composite")
+    variance = max_std is not None
+    if workers <= 1:
+        acc = accumulate(paths, th, variance)
+        return acc.composite(min_frac, max_delta, max_std), acc.keep(min_frac, max_delta, max_std), acc
+
+    shape = _read(paths[0]).shape[:2]
+    n = min(shards or workers, len(paths))
+    edges = np.linspace(0, len(paths), n + 1).astype(int)
+    tasks = [(paths[i0:i1], th, variance, shape)
+             for i0, i1 in zip(edges[:-1], edges[1:]) if i1 > i0]
+    acc = None
+    with mp.Pool(workers) as pool:
+        for part in pool.imap(_shard, tasks):
+            acc = part if acc is None else acc.merge(part)
+    return acc.composite(min_frac, max_delta, max_std), acc.keep(min_frac, max_delta, max_std), acc
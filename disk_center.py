@@ -0,0 +1,161 @@
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Earth‐disk centring from an alpha matte, for remthencentermov.py,
+#   remcenter1crop.py and friends.
+#
+#   widest_run(alpha) is the scripts' original rule, vectorised: the widest
+#   opaque row, and on it the first run of ≥ MIN_RUN opaque pixels (the whole
+#   opaque span if there is none).  Run starts / ends come from np.diff of
+#   the padded row instead of a Python loop over x; results are identical.
+#
+#   fit_disks(alphas) fits the disk itself.  Mattes are shrunk by SCALE
+#   (INTER_AREA, so edge pixels hold their coverage), every row's first long
+#   run is found at once with the same diff trick over the whole (N·H, W)
+#   stack, its two ends are placed to subpixel where the matte crosses half
+#   coverage, and per frame
+#     • cx = mean chord midpoint
+#     • cy, r from the least‐squares circle through the chords:
+#       (w/2)² + y² = 2·cy·y + (r² − cy²)
+#   using only chords longer than CHORD_MIN of the frame's longest, where
+#   the limb is steep enough in x to be well placed.  Coordinates are
+#   full‐size pixels (pixel centres at integers, as the row rule's).
+#
+#   center_frames(frames, alpha_fn) is the batch entry point for a year:
+#   it runs alpha_fn (e.g. rembg_matte.disk_alpha) on each frame, keeps only
+#   the shrunk matte and fits CHUNK frames per vectorised call.
+# ───────────────────────────────────────────────────────────────────────────────
+
+MIN_RUN = 10             # px at full size, shortest run that counts as disk
+SCALE = 0.25             # matte size the fit runs on
+CHORD_MIN = 0.3          # chords shorter than this × the longest are dropped
+CHUNK = 64               # frames per vectorised fit in center_frames
+
+
+def _runs(mask):
+    """(row, start, end) of every run of True in a 2‐D mask, row‐major order."""
+    m = mask.reshape(-1, mask.shape[-1])
+    padded = np.zeros((m.shape[0], m.shape[1] + 2), np.int8)
+    padded[:, 1:-1] = m
+    d = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(d == 1)
+    _, ends = np.nonzero(d == -1)
+    return rows, starts, ends - 1
+
+
+def widest_run(alpha, min_run=MIN_RUN):
+    """
+    (y_max, x_start, x_end) of the widest opaque row's first run of
+    ≥ min_run pixels, or of its whole opaque span; None if alpha is empty.
+    """
+    opaque = alpha > 0
+    widths = opaque.sum(axis=1)
+    y_max = int(np.argmax(widths))
+    if widths[y_max] == 0:
+        return None
+    _, starts, ends = _runs(opaque[y_max:y_max + 1])
+    long = np.flatnonzero(ends - starts + 1 >= min_run)
+    if len(long):
+        return y_max, int(starts[long[0]]), int(ends[long[0]])
+    return y_max, int(starts[0]), int(ends[-1])
+
+
+def row_center(alpha, min_run=MIN_RUN):
+    """(x_center, y_max) as the centring scripts computed it, or None."""
+    run = widest_run(alpha, min_run)
+    if run is None:
+        return None
+    y_max, x_start, x_end = run
+    return (x_start + x_end) // 2, y_max
+
+
+def shrink(alpha, scale=SCALE):
+    """alpha at `scale` of its size (INTER_AREA), uint8."""
+    h, w = alpha.shape[:2]
+    if scale >= 1.0:
+        return alpha
+    return cv2.resize(alpha, (max(int(round(w * scale)), 1), max(int(round(h * scale)), 1)),
+                      interpolation=cv2.INTER_AREA)
+
+
+def fit_disks(small, full_shape, min_run=MIN_RUN):
+    """
+    Disk centre and radius for each shrunk matte in small (N, h, w), in
+    pixels of the full_shape (H, W) frames: arrays cx, cy, r (NaN where
+    a frame has too few chords to fit).
+    """
+    small = np.asarray(small)
+    if small.ndim == 2:
+        small = small[None]
+    n, h, w = small.shape
+    fy, fx = full_shape[0] / h, full_shape[1] / w
+    a = small.reshape(n * h, w).astype(np.float32)
+    half = 127.5
+
+    rows, starts, ends = _runs(a > half)
+    keep = ends - starts + 1 >= max(int(round(min_run / fx)), 1)
+    rows, starts, ends = rows[keep], starts[keep], ends[keep]
+    rows, first = np.unique(rows, return_index=True)     # first long run per row
+    starts, ends = starts[first], ends[first]
+
+    # subpixel ends: where the matte, linear between pixel centres, crosses half
+    left = starts.astype(np.float64) - 0.5
+    inner = starts > 0
+    a0, a1 = a[rows[inner], starts[inner] - 1], a[rows[inner], starts[inner]]
+    left[inner] = starts[inner] - 1 + (half - a0) / np.maximum(a1 - a0, 1e-6)
+    right = ends.astype(np.float64) + 0.5
+    inner = ends < w - 1
+    a0, a1 = a[rows[inner], ends[inner]], a[rows[inner], ends[inner] + 1]
+    right[inner] = ends[inner] + (a0 - half) / np.maximum(a0 - a1, 1e-6)
+
+    # back to full‐size pixel centres
+    frame, y = np.divmod(rows, h)
+    y = (y + 0.5) * fy - 0.5
+    left, right = (left + 0.5) * fx - 0.5, (right + 0.5) * fx - 0.5
+    mid, hw = (left + right) / 2, (right - left) / 2
+
+    longest = np.zeros(n)
+    np.maximum.at(longest, frame, hw)
+    use = hw >= CHORD_MIN * longest[frame]
+    frame, y, mid, hw = frame[use], y[use], mid[use], hw[use]
+
+    # per‐frame sums for the mean midpoint and the 2×2 normal equations
+    def total(v):
+        return np.bincount(frame, v, minlength=n)
+
+    cnt = total(np.ones_like(y))
+    b = hw ** 2 + y ** 2
+    sy, syy, sb, syb = total(y), total(y * y), total(b), total(y * b)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cx = total(mid) / cnt
+        det = cnt * syy - sy * sy
+        cy = (cnt * syb - sy * sb) / (2 * det)     # A = [2y, 1]
+        c = (sb - 2 * cy * sy) / cnt
+        r = np.sqrt(c + cy * cy)
+    bad = cnt < 3
+    cx[bad] = cy[bad] = r[bad] = np.nan
+    return cx, cy, r
+
+
+def center_frames(frames, alpha_fn, scale=SCALE, min_run=MIN_RUN, chunk=CHUNK):
+    """
+    cx, cy, r arrays for every frame (anything alpha_fn takes, e.g. BGR
+    images) of an iterable, with alpha_fn(frame) giving its full‐size matte.
+    """
+    out, batch, shape = [], [], None
+    for frame in frames:
+        alpha = alpha_fn(frame)
+        if shape is not None and alpha.shape[:2] != shape:
+            out.append(fit_disks(np.stack(batch), shape, min_run))
+            batch = []
+        shape = alpha.shape[:2]
+        batch.append(shrink(alpha, scale))
+        if len(batch) == chunk:
+            out.append(fit_disks(np.stack(batch), shape, min_run))
+            batch = []
+    if batch:
+        out.append(fit_disks(np.stack(batch), shape, min_run))
+    if not out:
+        return np.empty(0), np.empty(0), np.empty(0)
+    return tuple(np.concatenate(v) for v in zip(*out))
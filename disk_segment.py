@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Geometric Earth‐disk matte, a fast path in place of rembg for full‐disk
+#   frames, where the background is everything outside a near‐elliptical limb.
+#
+#   On a copy shrunk to FIT_SIZE px: threshold at DISK_THRESH (the "darker
+#   than 10 is space" rule of find_earth_center / find_globe_center), open
+#   away grid lines and labels, take the largest blob's outer contour and
+#   least‐squares fit an ellipse to it (cv2.fitEllipse), refitting once on
+#   the points within FIT_INLIER_TOL of the first fit.  The matte is then
+#   drawn at full size as an anti‐aliased filled ellipse.
+#
+#   The fit is trusted only if the contour hugs it: median radial residual
+#   ≤ FIT_MAX_RESIDUAL of the radius and ≥ FIT_MIN_INLIERS of the points
+#   close to it.  A dark night‐side limb, a clipped disk or a frame with no
+#   disk fails that and fit_disk returns None, so the caller falls back to
+#   rembg (rembg_matte.disk_alpha with method "geometric").
+# ───────────────────────────────────────────────────────────────────────────────
+
+FIT_SIZE = 500           # px, longer side of the copy the limb is fitted on
+DISK_THRESH = 10         # gray > this is disk
+OPEN_PX = 5              # opening kernel at FIT_SIZE, removes lines / text
+FIT_INLIER_TOL = 0.01    # |r − 1| counted as on the ellipse
+FIT_MAX_RESIDUAL = 0.004 # median |r − 1| allowed
+FIT_MIN_INLIERS = 0.85   # fraction of contour points on the ellipse
+MIN_DISK_FRAC = 0.05     # blob must cover this much of the frame
+
+
+def _radial(pts, ellipse):
+    """Normalised radius r of each point in the ellipse's frame (1 = on it)."""
+    (cx, cy), (w, h), ang = ellipse
+    t = np.radians(ang)
+    x, y = pts[:, 0] - cx, pts[:, 1] - cy
+    u = x * np.cos(t) + y * np.sin(t)
+    v = -x * np.sin(t) + y * np.cos(t)
+    return np.sqrt((u / (w / 2.0)) ** 2 + (v / (h / 2.0)) ** 2)
+
+
+def fit_disk(img_bgr):
+    """
+    ((cx, cy), (w, h), angle) of the Earth limb in img_bgr's pixels, as
+    cv2.fitEllipse returns it, plus the median residual; None if the limb
+    doesn't fit an ellipse well enough to trust.
+    """
+    h, w = img_bgr.shape[:2]
+    f = min(FIT_SIZE / max(h, w), 1.0)
+    small = cv2.resize(img_bgr, (max(int(w * f), 1), max(int(h * f), 1)), interpolation=cv2.INTER_AREA)
+    gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    _, disk = cv2.threshold(gray, DISK_THRESH, 255, cv2.THRESH_BINARY)
+    if OPEN_PX:
+        disk = cv2.morphologyEx(disk, cv2.MORPH_OPEN,
+                                cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (OPEN_PX, OPEN_PX)))
+    cnts, _ = cv2.findContours(disk, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    if not cnts:
+        return None
+    big = max(cnts, key=cv2.contourArea)
+    if cv2.contourArea(big) < MIN_DISK_FRAC * disk.size or len(big) < 20:
+        return None
+    pts = big[:, 0, :].astype(np.float32)
+    # points on the frame border are the frame edge, not the limb
+    on_border = (pts[:, 0] <= 0) | (pts[:, 1] <= 0) | \
+                (pts[:, 0] >= disk.shape[1] - 1) | (pts[:, 1] >= disk.shape[0] - 1)
+    pts = pts[~on_border]
+    if len(pts) < 20:
+        return None
+
+    ellipse = cv2.fitEllipse(pts)
+    inl = np.abs(_radial(pts, ellipse) - 1.0) <= FIT_INLIER_TOL
+    if inl.sum() >= 20 and not inl.all():
+        ellipse = cv2.fitEllipse(pts[inl])
+    resid = np.abs(_radial(pts, ellipse) - 1.0)
+    if np.median(resid) > FIT_MAX_RESIDUAL or np.mean(resid <= FIT_INLIER_TOL) < FIT_MIN_INLIERS:
+        return None
+
+    (cx, cy), (ew, eh), ang = ellipse
+    # contour points are the centres of the disk's outer pixels, but on the
+    # INTER_AREA copy any pixel the limb covers a little of is over the
+    # threshold, which puts those centres about on the limb: no offset
+    full = (((cx + 0.5) / f - 0.5, (cy + 0.5) / f - 0.5), (ew / f, eh / f), ang)
+    return full, float(np.median(resid))
+
+
+def ellipse_alpha(shape, ellipse):
+    """Anti‐aliased filled ellipse matte (uint8, 255 inside) of size shape[:2]."""
+    (cx, cy), (w, h), ang = ellipse
+    alpha = np.zeros(shape[:2], np.uint8)
+    s = 16  # 4 fractional bits
+    cv2.ellipse(alpha, (int(round(cx * s)), int(round(cy * s))),
+                (int(round(w / 2 * s)), int(round(h / 2 * s))), ang, 0, 360,
+                255, -1, cv2.LINE_AA, 4)
+    return alpha
+
+
+def disk_alpha(img_bgr):
+    """Analytic matte of img_bgr's Earth disk, or None if the limb fit is poor."""
+    fit = fit_disk(img_bgr)
+    if fit is None:
+        return None
+    return ellipse_alpha(img_bgr.shape, fit[0])
@@ -2,6 +2,7 @@ import os
 import cv2
 import numpy as np
 import re
+from temporal_background import build_background
 
 # Configuration
 YEAR = 1977
@@ -13,17 +14,30 @@ OUTPUT_VIDEO = "/ships22/sds/goes/digitized/32A/vissr/1977/grid_aligned/aligned_
 BRIGHTNESS_THRESHOLD = 180
 FPS = 10
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+BACKGROUND = "marble"      # "marble": MARBLE_PATH; "median": per-pixel temporal quantile of INPUT_DIR (temporal_background.py)
+BACKGROUND_QUANTILE = 0.2  # 0.5 = median; lower keeps less cloud
+BACKGROUND_METHOD = "histogram"  # or "frugal" (smaller, approximate)
+BACKGROUND_PATH = os.path.join(OUTPUT_DIR, f"background_q{int(BACKGROUND_QUANTILE * 100)}.png")  # built once, reused
 
-# Load background image
-marble = cv2.imread(MARBLE_PATH)
-if marble is None:
-    raise FileNotFoundError(f"Cannot load marble background from {MARBLE_PATH}")
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Match size to input images
 sample_img = cv2.imread(next((os.path.join(INPUT_DIR, f) for f in os.listdir(INPUT_DIR) if f.endswith('.png')), None))
 if sample_img is None:
     raise FileNotFoundError(f"No input images found in {INPUT_DIR}")
+
+# Load background image
+if BACKGROUND == "median":
+    marble = cv2.imread(BACKGROUND_PATH) if os.path.isfile(BACKGROUND_PATH) else None
+    if marble is None:
+        bg_paths = sorted(os.path.join(INPUT_DIR, f) for f in os.listdir(INPUT_DIR) if f.endswith(".png"))
+        marble = build_background(bg_paths, BACKGROUND_QUANTILE, BACKGROUND_METHOD,
+                                  size=(sample_img.shape[1], sample_img.shape[0]))
+        cv2.imwrite(BACKGROUND_PATH, marble)
+else:
+    marble = cv2.imread(MARBLE_PATH)
+    if marble is None:
+        raise FileNotFoundError(f"Cannot load marble background from {MARBLE_PATH}")
 if marble.shape[:2] != sample_img.shape[:2]:
     marble = cv2.resize(marble, (sample_img.shape[1], sample_img.shape[0]))
 
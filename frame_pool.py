@@ -0,0 +1,74 @@
+import multiprocessing as mp
+from collections import deque
+from itertools import islice
+from multiprocessing.util import Finalize
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Ordered process pool for the year runners.  Frames are handed out in
+#   chunks of consecutive frames, finish in any order, and come back out in
+#   the order they went in — which is what the cv2.VideoWriters in the
+#   parent need.
+#
+#   At most WINDOW chunks per worker are submitted ahead of the oldest one
+#   not yet yielded, so one slow early frame holds back at most that many
+#   finished chunks (each frame's result is a few ~24 MB arrays) instead of
+#   the rest of the year.
+#
+#   Per‐worker state (a worker's frames are not contiguous in time, so the
+#   scripts don't track alignment across frames with WORKERS > 1) is set up
+#   by the initializer; at_worker_exit registers its cleanup, which runs when
+#   the pool is closed and the workers exit normally.
+# ───────────────────────────────────────────────────────────────────────────────
+
+CHUNK_SIZE = 8           # consecutive frames per worker hand‐out
+WINDOW = 2               # chunks in flight per worker
+
+
+def _call(args):
+    worker, chunk = args
+    return [worker(task) for task in chunk]
+
+
+def at_worker_exit(fn):
+    """Runs fn() when this (worker) process exits cleanly."""
+    Finalize(None, fn, exitpriority=10)
+
+
+def run_ordered(worker, tasks, workers, initializer=None, chunksize=CHUNK_SIZE, window=WINDOW):
+    """
+    Yields worker(task) for every task, in task order.
+
+    With workers <= 1 everything runs in this process (initializer is still
+    called once), which is the old single‐core behaviour.  Otherwise chunks
+    of tasks go to a Pool of that many processes, no more than
+    workers × window of them ahead of the one being waited on.
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer()
+        for task in tasks:
+            yield worker(task)
+        return
+
+    tasks = iter(tasks)
+    limit = max(workers * window, 1)
+    pool = mp.Pool(workers, initializer=initializer)
+    try:
+        inflight = deque()
+
+        def submit():
+            while len(inflight) < limit:
+                chunk = list(islice(tasks, chunksize))
+                if not chunk:
+                    return
+                inflight.append(pool.apply_async(_call, ((worker, chunk),)))
+
+        submit()
+        while inflight:
+            results = inflight.popleft().get()
+            submit()
+            yield from results
+        pool.close()  # workers exit normally, running at_worker_exit cleanups
+        pool.join()
+    finally:
+        pool.terminate()
@@ -0,0 +1,160 @@
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Green‐pixel fill shared by the heal / clean scripts.  Pure GREEN pixels
+#   are replaced, a ring at a time, by the mean of their non‐green 8‐neighbours.
+#   Same result, bit for bit, as the per‐pixel loop that used to be copied into
+#   each script, but every pass is two 3×3 box sums over the green region's
+#   bounding box instead of a Python loop over its pixels.
+#
+#   distance_green_fill is the single‐pass alternative: one chessboard distance
+#   transform orders the green pixels by ring, and each ring is filled from
+#   the rings already done, so every pixel is visited once and nothing outside
+#   the green pixels is rescanned.  Select with green_fill(img, mode).
+# ───────────────────────────────────────────────────────────────────────────────
+
+GREEN = np.array((0, 255, 0), dtype=np.uint8)
+
+# 8‐neighbourhood, centre excluded
+_NEIGH = np.array([[1, 1, 1],
+                   [1, 0, 1],
+                   [1, 1, 1]], dtype=np.float32)
+
+
+def _bbox(mask, pad):
+    """Row/column slices around the set pixels of mask, grown by pad."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    h, w = mask.shape
+    return (slice(max(rows[0] - pad, 0), min(rows[-1] + pad + 1, h)),
+            slice(max(cols[0] - pad, 0), min(cols[-1] + pad + 1, w)))
+
+
+def fill_green_once(img, green_mask):
+    """
+    One pass: every pixel set in green_mask that has at least one non‐green
+    8‐neighbour becomes the mean of those neighbours (truncated to uint8, as
+    np.mean(...).astype(np.uint8) did).  Returns (new image, changed).
+    """
+    out = img.copy()
+    if not green_mask.any():
+        return out, False
+
+    ys, xs = _bbox(green_mask, 1)
+    mask = green_mask[ys, xs]
+    valid = (~mask).astype(np.float32)
+    # Sums of ≤ 8 uint8 values are exact in float32, and dividing the exact
+    # sum in float64 is what np.mean does, so the truncation matches too.
+    count = cv2.filter2D(valid, -1, _NEIGH, borderType=cv2.BORDER_CONSTANT)
+    target = mask & (count > 0)
+    if not target.any():
+        return out, False
+
+    vals = img[ys, xs].astype(np.float32)
+    if vals.ndim == 3:
+        vals *= valid[:, :, None]
+    else:
+        vals *= valid
+    sums = cv2.filter2D(vals, -1, _NEIGH, borderType=cv2.BORDER_CONSTANT)
+    if sums.ndim < vals.ndim:  # filter2D drops a trailing single channel
+        sums = sums[:, :, None]
+
+    n = count[target].astype(np.float64)
+    if vals.ndim == 3:
+        n = n[:, None]
+    out[ys, xs][target] = (sums[target].astype(np.float64) / n).astype(np.uint8)
+    return out, True
+
+
+def recursive_green_fill(img):
+    """
+    Repeats fill_green_once until no pure‐GREEN pixel is left or a pass
+    changes nothing.  The mask is rebuilt from the image each pass, so a
+    fill that averages to exactly GREEN is filled again, as before.
+    """
+    while True:
+        green_mask = cv2.inRange(img, GREEN, GREEN) > 0  # np.all(img == GREEN, axis=2)
+        if not green_mask.any(): break
+        img, chg = fill_green_once(img, green_mask)
+        if not chg: break
+    return img
+
+
+# Neighbour offsets into a (h + 2) × (w + 2) padded, flattened image
+def _flat_neighbours(w2):
+    return np.array([-w2 - 1, -w2, -w2 + 1, -1, 1, w2 - 1, w2, w2 + 1])
+
+
+def distance_green_fill(img, green_mask=None):
+    """
+    Fills every pure‐GREEN pixel (or green_mask, if given) in one pass over
+    the mask, ring by ring in order of chessboard distance to the nearest
+    non‐green pixel, each from the mean of its already‐known 8‐neighbours.
+
+    A ring‐r pixel sees exactly the neighbours that pass r of
+    recursive_green_fill would, so the output is the same except where a
+    fill happens to average to exactly GREEN (the iterative mode fills those
+    again on a later pass; here they are kept).
+    """
+    if green_mask is None:
+        green_mask = cv2.inRange(img, GREEN, GREEN) > 0
+    out = img.copy()
+    if not green_mask.any() or green_mask.all():
+        return out
+
+    ys, xs = _bbox(green_mask, 1)
+    mask = green_mask[ys, xs]
+    h, w = mask.shape
+    ring = cv2.distanceTransform(mask.astype(np.uint8), cv2.DIST_C, 3).astype(np.int32)
+
+    # Padded working copies: each pixel's channels packed 16 bits apart in
+    # one int64 (a sum of 8 uint8 values can't carry into the next channel),
+    # 0 until known so unknown neighbours add nothing; and the known flags
+    chans = 1 if img.ndim == 2 else img.shape[2]
+    src = img[ys, xs].reshape(h, w, chans)
+    shifts = 16 * np.arange(chans)
+    packed = np.zeros((h + 2, w + 2), np.int64)
+    inner = packed[1:-1, 1:-1]
+    for c in range(chans):
+        inner |= src[:, :, c].astype(np.int64) << int(shifts[c])
+    inner[mask] = 0
+    known = np.zeros((h + 2, w + 2), np.uint8)
+    known[1:-1, 1:-1] = ~mask
+    packed = packed.reshape(-1)
+    known = known.reshape(-1)
+
+    my, mx = np.nonzero(mask)
+    r = ring[my, mx]
+    order = np.argsort(r, kind="stable")
+    r = r[order]
+    my, mx = my[order], mx[order]
+    idx = (my + 1) * (w + 2) + (mx + 1)
+    bounds = np.searchsorted(r, np.arange(1, r[-1] + 2))
+
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        pix = idx[lo:hi]
+        sums = np.zeros(len(pix), np.int64)
+        count = np.zeros(len(pix), np.int64)
+        for off in _flat_neighbours(w + 2):
+            sums += packed[pix + off]
+            count += known[pix + off]
+        # integer floor == the old np.mean(...).astype(np.uint8) truncation
+        chan_sums = (sums[:, None] >> shifts) & 0xFFFF
+        packed[pix] = ((chan_sums // count[:, None]) << shifts).sum(axis=1)
+        known[pix] = 1
+
+    filled = ((packed[idx][:, None] >> shifts) & 0xFF).astype(np.uint8)
+    out[ys, xs][my, mx] = filled if img.ndim == 3 else filled[:, 0]
+    return out
+
+
+FILL_MODES = {
+    "iterative": recursive_green_fill,
+    "distance": distance_green_fill,
+}
+
+
+def green_fill(img, mode="iterative"):
+    """Fills pure‐GREEN pixels with the FILL_MODES entry named by mode."""
+    return FILL_MODES[mode](img)
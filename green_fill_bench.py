@@ -0,0 +1,79 @@
+import time
+import cv2
+import numpy as np
+from green_fill import GREEN, FILL_MODES
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Times each green_fill.py mode against grid thickness.  The grid is
+#   painted green at every THICKEN_PIXELS / brush_size in THICKNESSES over
+#   IMAGE_PATH (or a synthetic frame if None), filled by every FILL_MODES
+#   entry, and the time and max difference from the iterative mode printed.
+# ───────────────────────────────────────────────────────────────────────────────
+
+IMAGE_PATH = None            # e.g. an aligned_with_grid/*.png frame
+GRID_PATH = None             # grid mask png; None = synthetic lat/lon‐ish lines
+FRAME_SIZE = (2000, 2000)
+THICKNESSES = (1, 3, 5, 7, 9, 13, 17, 25)
+REPEATS = 3                  # best of
+
+
+def load_frame():
+    if IMAGE_PATH:
+        img = cv2.imread(IMAGE_PATH)
+        if img is None:
+            raise FileNotFoundError(IMAGE_PATH)
+        return cv2.resize(img, FRAME_SIZE)
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (FRAME_SIZE[1] // 8, FRAME_SIZE[0] // 8, 3), dtype=np.uint8)
+    img = cv2.resize(noise, FRAME_SIZE, interpolation=cv2.INTER_CUBIC)
+    img[..., 1] = np.minimum(img[..., 1], 254)  # no accidental pure green
+    return img
+
+
+def load_grid():
+    if GRID_PATH:
+        rgba = cv2.imread(GRID_PATH, cv2.IMREAD_UNCHANGED)
+        if rgba is None:
+            raise FileNotFoundError(GRID_PATH)
+        src = rgba[:, :, 3] if rgba.ndim == 3 and rgba.shape[2] == 4 else cv2.cvtColor(rgba, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(np.where(src > 127, 255, 0).astype(np.uint8), FRAME_SIZE,
+                          interpolation=cv2.INTER_NEAREST)
+    w, h = FRAME_SIZE
+    grid = np.zeros((h, w), np.uint8)
+    for k in range(60, max(w, h), 90):
+        cv2.line(grid, (k, 0), (k + 40, h - 1), 255, 1)
+        cv2.line(grid, (0, k), (w - 1, k + 30), 255, 1)
+    return grid
+
+
+def best_time(fn, img):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        out = fn(img.copy())
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    frame = load_frame()
+    grid = load_grid()
+    modes = list(FILL_MODES)
+    print(f"{'thick':>5} {'green px':>9} " + " ".join(f"{m + ' s':>12}" for m in modes) + "  max diff")
+    for t in THICKNESSES:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (t, t))
+        mask = cv2.dilate(grid, kernel, iterations=1) > 0
+        img = frame.copy()
+        img[mask] = GREEN
+
+        times, outs = [], []
+        for m in modes:
+            dt, out = best_time(FILL_MODES[m], img)
+            times.append(dt)
+            outs.append(out)
+        diff = max(int(np.abs(o.astype(np.int16) - outs[0]).max()) for o in outs)
+        print(f"{t:>5} {int(mask.sum()):>9} " + " ".join(f"{dt:>12.3f}" for dt in times) + f"  {diff:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import os
 from datetime import date, timedelta
 from rembg import remove, new_session
 from PIL import Image
+from green_fill import fill_green_once
 
 img = cv.imread("images/comb.png")
 
@@ -19,21 +20,6 @@ upper = np.array([255,255,255],np.uint8)
 kernel = cv.getStructuringElement(cv.MORPH_ELLIPSE,(brush_size,brush_size))
 GREEN  = np.array((0,255,0),np.uint8)
 
-def fill_green_once(shifted, green_mask):
-    h,w = green_mask.shape
-    out = shifted.copy(); changed=False
-    neigh = [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(-1,1),(1,-1),(1,1)]
-    ys,xs = np.where(green_mask)
-    for y,x in zip(ys,xs):
-        vals=[]
-        for dy,dx in neigh:
-            ny,nx = y+dy, x+dx
-            if 0<=ny<h and 0<=nx<w and not green_mask[ny,nx]:
-                vals.append(shifted[ny,nx])
-        if vals:
-            out[y,x] = np.mean(vals,axis=0).astype(np.uint8)
-            changed=True
-    return out,changed
 pil = Image.fromarray(cv.cvtColor(img, cv.COLOR_BGR2RGB))
 rembg_pil = remove(pil).convert("RGBA")
 rgba_arr = np.array(rembg_pil)  # H×W×4
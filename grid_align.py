@@ -0,0 +1,593 @@
+import cv2
+import numpy as np
+from mask_store import rotated_mask, rotated_sweep, sweep_spectra
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Shared grid ↔ satellite alignment helpers for the heal scripts
+#   (telea_heal_subpoint*.py, telea_heal_76.py, gridir77.py, gridvi77.py,
+#    mask_heal_test.py).  Nothing here reads config; the scripts pass their
+#   own MAX_ANGLE / ANGLE_STEP / MAX_SHIFT in.  Rotated grid masks and their
+#   spectra come from mask_store.py, so they are built once per mask and θ
+#   (and, with mask_store.set_cache_dir, once across runs).
+# ───────────────────────────────────────────────────────────────────────────────
+
+ANGLE_BATCH = 8          # angles per batched inverse FFT (bounds peak memory)
+CENTROID_BOX = 5         # 5×5 sub‐pixel peak window, same as cv2.phaseCorrelate
+
+# Fourier–Mellin rotation estimate
+FM_POLAR_ROWS = 3600     # angle samples over 360° (0.1° per row before sub‐pixel)
+FM_POLAR_COLS = 512      # log‐radius samples
+FM_BAND = (0.5, 0.95)    # log‐radius band kept; drops DC and window leakage
+FM_REFINE_STEPS = 2      # ±ANGLE_STEP steps swept around the estimate (0 = none)
+
+# Coarse‐to‐fine pyramid
+PYRAMID_LEVELS = 2       # coarse search at 2**levels downsampling (2 → 4×, 3 → 8×)
+
+# Frame‐to‐frame tracking
+TRACK_ANGLE_WINDOW = 0.3 # ± degrees searched around the previous θ
+TRACK_SHIFT_WINDOW = 20  # ± pixels allowed around the previous (dx, dy)
+TRACK_MIN_RATIO = 0.8    # tracked score must reach this × last full‐search score
+
+
+def theta_range(max_angle, angle_step):
+    """The θ list the scripts sweep: [−max_angle .. +max_angle] in angle_step."""
+    return np.arange(-max_angle, max_angle + 1e-5, angle_step)
+
+
+def rotate_image(img, angle_deg, interp=cv2.INTER_LINEAR):
+    h, w = img.shape[:2]
+    M = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), angle_deg, 1.0)
+    return cv2.warpAffine(img, M, (w, h), flags=interp)
+
+
+def translate_image(img, dx, dy, interp=cv2.INTER_LINEAR):
+    h, w = img.shape[:2]
+    M = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv2.warpAffine(img, M, (w, h), flags=interp)
+
+
+def clamp_shift(dx, dy, max_shift):
+    dx_c = max(-max_shift, min(max_shift, dx))
+    dy_c = max(-max_shift, min(max_shift, dy))
+    return dx_c, dy_c
+
+
+def _even_dft_size(n):
+    m = cv2.getOptimalDFTSize(n)
+    while m % 2:
+        m = cv2.getOptimalDFTSize(m + 1)
+    return m
+
+
+def phase_correlate(src, dst):
+    """
+    cv2.phaseCorrelate(src, dst) with both inputs zero‐padded to an even DFT
+    size first.  OpenCV pads to getOptimalDFTSize itself, but its fftShift is
+    half a pixel off when that size is odd (e.g. 1875 rows for a 2000 px frame
+    cropped by 1/12), which costs overlap on 1–2 px grid lines.
+    """
+    h, w = src.shape[:2]
+    M, N = _even_dft_size(h), _even_dft_size(w)
+    src = cv2.copyMakeBorder(src.astype(np.float32), 0, M - h, 0, N - w, cv2.BORDER_CONSTANT, value=0)
+    dst = cv2.copyMakeBorder(dst.astype(np.float32), 0, M - h, 0, N - w, cv2.BORDER_CONSTANT, value=0)
+    (dx, dy), _ = cv2.phaseCorrelate(src, dst)
+    return dx, dy
+
+
+def overlap_score(mask, dx, dy, sat_thresh, y_off):
+    """countNonZero(translate(mask, dx, dy)[y_off:] & sat_thresh)."""
+    aligned = translate_image(mask, dx, dy, interp=cv2.INTER_NEAREST)
+    return cv2.countNonZero(cv2.bitwise_and(aligned[y_off:, :], sat_thresh))
+
+
+def alignment_matrix(theta, dx, dy, shape):
+    """
+    2×3 forward affine of rotate_image(·, θ) followed by
+    translate_image(·, dx, dy) for an image of the given shape.
+    """
+    h, w = shape[:2]
+    M = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), theta, 1.0)
+    M[0, 2] += dx
+    M[1, 2] += dy
+    return M
+
+
+def compose_affine(*mats):
+    """Single 2×3 affine equal to applying mats[0] first, then mats[1], …"""
+    out = np.eye(3)
+    for M in mats:
+        out = np.vstack([M, [0.0, 0.0, 1.0]]) @ out
+    return out[:2]
+
+
+def unalign_matrix(theta, dx, dy, shape):
+    """
+    2×3 affine of translate_image(·, −dx, −dy) followed by
+    rotate_image(·, −θ): what the heal scripts apply to a frame once the grid
+    has been matched, as one matrix.
+    """
+    h, w = shape[:2]
+    T = np.float64([[1, 0, -dx], [0, 1, -dy]])
+    R = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), -theta, 1.0)
+    return compose_affine(T, R)
+
+
+def normalize_alignment(theta, dx, dy, shape):
+    """
+    (θ, dx, dy) found on a frame of `shape` → resolution‐free (θ, u, v), the
+    shift as a fraction of the frame's width and height.  θ is unchanged by
+    resampling, so scale_alignment() replays the result on the full‐size scan
+    the .med.png was made from (rotation centres differ by half a pixel
+    between sizes, which at |θ| ≤ a few degrees moves nothing measurably).
+    """
+    h, w = shape[:2]
+    return theta, dx / w, dy / h
+
+
+def scale_alignment(theta, u, v, shape):
+    """Inverse of normalize_alignment for a frame of `shape`: (θ, dx, dy)."""
+    h, w = shape[:2]
+    return theta, u * w, v * h
+
+
+def resize_matrix(shape, dsize):
+    """2×3 affine of cv2.resize from an image of `shape` to dsize = (w, h)."""
+    h, w = shape[:2]
+    sx, sy = dsize[0] / w, dsize[1] / h
+    return np.float64([[sx, 0, 0.5 * sx - 0.5], [0, sy, 0.5 * sy - 0.5]])
+
+
+def translate_matrix(tx, ty):
+    return np.float64([[1, 0, tx], [0, 1, ty]])
+
+
+def warp_frame(img, M, dsize=None, interp=cv2.INTER_LINEAR):
+    """One warpAffine of img by a composed matrix (dsize defaults to img's size)."""
+    h, w = img.shape[:2]
+    return cv2.warpAffine(img, M, dsize or (w, h), flags=interp)
+
+
+class SparseGridScorer:
+    """
+    Overlap scoring from the grid mask's pixel list instead of warped images.
+    The set pixels are kept as one 3×n coordinate array; a candidate
+    (θ, dx, dy) maps them with the single composed alignment_matrix, rounds
+    the way warpAffine's INTER_NEAREST does, and samples the (cropped)
+    satellite threshold there.  The score is the number of grid pixels
+    landing on a set satellite pixel, which matches
+    countNonZero(translate(rotate(mask)) & sat) up to the odd pixel that
+    rotation maps twice or skips.
+
+    Only this overlap count is sparse (cost proportional to grid length, not
+    frame area).  Each θ's (dx, dy) still comes from a phase correlation of
+    the full rotated mask against the frame, so a sweep's cost is still set
+    by those frame‐sized FFTs; sparse scoring saves the warp and the AND.
+    """
+
+    def __init__(self, grid_mask):
+        self.grid_mask = grid_mask
+        self.shape = grid_mask.shape[:2]
+        ys, xs = np.nonzero(grid_mask)
+        self.pts = np.stack([xs, ys, np.ones_like(xs)]).astype(np.float64)
+
+    def score(self, sat_bin, theta, dx, dy, y_off=0):
+        """Overlap with sat_bin, the frame threshold cropped from row y_off."""
+        q = alignment_matrix(theta, dx, dy, self.shape) @ self.pts
+        # warpAffine samples src = floor(M⁻¹·dst + ½), i.e. dst = ceil(M·src − ½)
+        x = np.ceil(q[0] - 0.5).astype(np.intp)
+        y = np.ceil(q[1] - 0.5).astype(np.intp) - y_off
+        h, w = sat_bin.shape[:2]
+        ok = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+        return int(np.count_nonzero(sat_bin[y[ok], x[ok]]))
+
+
+def _score(scorer, rot, theta, dx, dy, sat_thresh, y_off):
+    if scorer is not None:
+        return scorer.score(sat_thresh, theta, dx, dy, y_off)
+    return overlap_score(rot, dx, dy, sat_thresh, y_off)
+
+
+def _peak_shifts(corr):
+    """
+    Sub‐pixel peak of a stack of (unshifted) correlation surfaces.
+    Mirrors cv2.phaseCorrelate: argmax, then weighted centroid over a
+    CENTROID_BOX window in fftShift'ed coordinates.  Returns arrays (dx, dy)
+    of the src2‐relative‐to‐src1 shift for each surface.
+    """
+    n, M, N = corr.shape
+    flat = corr.reshape(n, -1).argmax(axis=1)
+    py, px = np.unravel_index(flat, (M, N))
+    # fftShift'ed position of the peak; windows are read back through the wrap
+    py = (py + M // 2) % M
+    px = (px + N // 2) % N
+    r = CENTROID_BOX // 2
+    dxs = np.empty(n)
+    dys = np.empty(n)
+    for i in range(n):
+        ys = np.arange(max(py[i] - r, 0), min(py[i] + r, M - 1) + 1)
+        xs = np.arange(max(px[i] - r, 0), min(px[i] + r, N - 1) + 1)
+        win = corr[i][np.ix_((ys - M // 2) % M, (xs - N // 2) % N)].astype(np.float64)
+        total = win.sum() + np.finfo(np.float64).eps
+        dxs[i] = N // 2 - (win.sum(axis=0) * xs).sum() / total
+        dys[i] = M // 2 - (win.sum(axis=1) * ys).sum() / total
+    return dxs, dys
+
+
+class FFTGridMatcher:
+    """
+    Same θ sweep as the scripts' match_grid_to_satellite, without redoing
+    the FFTs every call:
+      • the rotated grid masks and their (cropped, padded) spectra are built
+        once and reused for every following frame with the same y_off;
+      • the thresholded satellite frame is transformed once per frame;
+      • all angles are cross‐powered and inverse‐transformed in batches of
+        ANGLE_BATCH with NumPy, then each (θ, dx, dy) is scored by overlap.
+
+    The cached spectra are complex64 of the padded DFT size, so a 2000×2000
+    mask with the default ±2.2°/0.1° sweep holds roughly 0.7 GB; they live in
+    mask_store.py, shared by every matcher on the same mask and sweep, and
+    memory‐mapped from disk when its cache directory is set.  The matcher
+    holds no reference to them, so mask_store's MAX_SWEEPS bound is what
+    decides how many masks' sweeps stay resident.
+    """
+
+    def __init__(self, grid_mask, max_angle, angle_step, max_shift, sparse=False):
+        self.grid_mask = grid_mask
+        self.scorer = SparseGridScorer(grid_mask) if sparse else None
+        self.max_angle = max_angle
+        self.angle_step = angle_step
+        self.thetas = theta_range(max_angle, angle_step)
+        self.max_shift = max_shift
+        self._y_off = None
+        self._dft_shape = None
+
+    def _prepare(self, y_off):
+        if self._y_off == y_off:
+            return
+        h, w = self.grid_mask.shape
+        self._dft_shape = (cv2.getOptimalDFTSize(h - y_off), cv2.getOptimalDFTSize(w))
+        self._y_off = y_off
+
+    @property
+    def _rot_masks(self):
+        return rotated_sweep(self.grid_mask, self.thetas)
+
+    @property
+    def _mask_specs(self):
+        return sweep_spectra(self.grid_mask, self.thetas, self._y_off, self._dft_shape)
+
+    def sat_spectrum(self, sat_thresh, y_off):
+        """Spectrum of the cropped satellite threshold image (once per frame)."""
+        self._prepare(y_off)
+        return np.fft.rfft2(sat_thresh.astype(np.float32), s=self._dft_shape)
+
+    def shifts(self, sat_spec):
+        """Phase‐correlation (dx, dy) of every cached angle against sat_spec."""
+        M, N = self._dft_shape
+        sat_conj = np.conj(sat_spec)
+        mask_specs = self._mask_specs
+        dxs, dys = [], []
+        for b in range(0, len(self.thetas), ANGLE_BATCH):
+            P = mask_specs[b:b + ANGLE_BATCH] * sat_conj
+            P /= np.abs(P) + np.finfo(np.float32).eps
+            corr = np.fft.irfft2(P, s=(M, N))
+            dx, dy = _peak_shifts(corr)
+            dxs.append(dx)
+            dys.append(dy)
+        return np.concatenate(dxs), np.concatenate(dys)
+
+    def match(self, sat_thresh, y_off, sat_spec=None):
+        """Return best (θ, dx, dy, score), like match_grid_to_satellite."""
+        if sat_spec is None:
+            sat_spec = self.sat_spectrum(sat_thresh, y_off)
+        dxs, dys = self.shifts(sat_spec)
+        best_score = -1
+        best_params = (0.0, 0.0, 0.0)
+        for theta, rot, dx, dy in zip(self.thetas, self._rot_masks, dxs, dys):
+            dx, dy = clamp_shift(float(dx), float(dy), self.max_shift)
+            overlap = _score(self.scorer, rot, theta, dx, dy, sat_thresh, y_off)
+            if overlap > best_score:
+                best_score = overlap
+                best_params = (float(theta), dx, dy)
+        return (*best_params, best_score)
+
+
+def _logpolar_magnitude(img):
+    """
+    Log‐polar resampled magnitude spectrum of img (Hanning windowed), with
+    only the FM_BAND radii kept and each radius made zero‐mean over angle.
+    A rotation of img is a circular shift of the rows of this array, and any
+    translation of img drops out with the phase.
+    """
+    h, w = img.shape
+    win = cv2.createHanningWindow((w, h), cv2.CV_32F)
+    # plain magnitude: log1p flattens the grid streaks into the window's
+    # axis cross and pulls large angles back towards 0°
+    mag = np.fft.fftshift(np.abs(np.fft.fft2(img.astype(np.float32) * win)))
+    mag = mag.astype(np.float32)
+    lp = cv2.warpPolar(mag, (FM_POLAR_COLS, FM_POLAR_ROWS), (w / 2.0, h / 2.0),
+                       min(h, w) / 2.0, cv2.INTER_LINEAR | cv2.WARP_POLAR_LOG)
+    lo, hi = (int(FM_POLAR_COLS * f) for f in FM_BAND)
+    lp = lp[:, lo:hi]
+    return lp - lp.mean(axis=0, keepdims=True)
+
+
+def estimate_rotation(mask_lp, sat_lp, max_angle):
+    """
+    θ (degrees, same sense as rotate_image) that best rotates the mask onto
+    the satellite frame, from their _logpolar_magnitude arrays.  The rows are
+    circularly cross‐correlated, the peak is taken within ±max_angle and
+    refined with a parabola fit.
+    """
+    rows = mask_lp.shape[0]
+    A = np.fft.rfft(mask_lp, axis=0)
+    B = np.fft.rfft(sat_lp, axis=0)
+    corr = np.fft.irfft((B * np.conj(A)).sum(axis=1), n=rows)
+    k = int(np.ceil(max_angle * rows / 360.0))
+    idx = np.r_[0:k + 1, rows - k:rows]
+    peak = idx[np.argmax(corr[idx])]
+    y0, y1, y2 = corr[(peak - 1) % rows], corr[peak], corr[(peak + 1) % rows]
+    denom = y0 - 2 * y1 + y2
+    sub = 0.5 * (y0 - y2) / denom if denom != 0 else 0.0
+    shift = peak if peak <= rows // 2 else peak - rows
+    return -(shift + sub) * 360.0 / rows
+
+
+class FourierMellinMatcher:
+    """
+    Alignment without the θ sweep: rotation comes straight from the
+    log‐polar magnitude spectra (estimate_rotation), then one phase
+    correlation gives (dx, dy).  With refine_steps > 0 the usual
+    rotate / phase‐correlate / overlap check is run on the sweep's θ
+    nearest the estimate and refine_steps of its neighbours either side,
+    so the cost no longer grows with max_angle and every candidate is one
+    the sweep would have tried.
+    """
+
+    def __init__(self, grid_mask, max_angle, angle_step, max_shift, sparse=False,
+                 refine_steps=FM_REFINE_STEPS):
+        self.grid_mask = grid_mask
+        self.scorer = SparseGridScorer(grid_mask) if sparse else None
+        self.max_angle = max_angle
+        self.angle_step = angle_step
+        self.max_shift = max_shift
+        self.refine_steps = refine_steps
+        self._thetas = theta_range(max_angle, angle_step)
+        self._y_off = None
+        self._mask_lp = None
+
+    def match(self, sat_thresh, y_off):
+        """Return best (θ, dx, dy, score), like match_grid_to_satellite."""
+        if self._y_off != y_off:
+            self._mask_lp = _logpolar_magnitude(self.grid_mask[y_off:, :])
+            self._y_off = y_off
+        theta0 = estimate_rotation(self._mask_lp, _logpolar_magnitude(sat_thresh),
+                                   self.max_angle)
+        # snap to the sweep's θ grid, then step along it
+        i = int(np.argmin(np.abs(self._thetas - theta0)))
+        k = np.arange(i - self.refine_steps, i + self.refine_steps + 1)
+        thetas = self._thetas[np.clip(k, 0, len(self._thetas) - 1)]
+
+        sat_f = sat_thresh.astype(np.float32)
+        best_score = -1
+        best_params = (0.0, 0.0, 0.0)
+        for theta in np.unique(thetas):
+            rot = rotated_mask(self.grid_mask, theta)
+            dx, dy = phase_correlate(rot[y_off:, :], sat_f)
+            dx, dy = clamp_shift(dx, dy, self.max_shift)
+            overlap = _score(self.scorer, rot, theta, dx, dy, sat_thresh, y_off)
+            if overlap > best_score:
+                best_score = overlap
+                best_params = (float(theta), dx, dy)
+        return (*best_params, best_score)
+
+
+def downsample_binary(binary, factor):
+    """Shrink a 0/255 mask by factor, keeping any cell that had a set pixel."""
+    h, w = binary.shape
+    small = cv2.resize(binary, (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+    return np.where(small > 0, 255, 0).astype(np.uint8)
+
+
+class PyramidMatcher:
+    """
+    Coarse‐to‐fine version of the θ sweep (the two‐level scan of
+    reb_mask_unaligned_wb.find_bar_transform, on an image pyramid):
+      1. full sweep of θ, phase correlation and overlap on the 2**levels
+         downsampled mask and satellite threshold;
+      2. back at full resolution, only θ ± one coarse step (in angle_step
+         increments) is re‐checked.  Each θ keeps its own full‐resolution
+         phase‐correlation shift; the upscaled coarse shift is only tried
+         instead when the two disagree by more than a coarse pixel, and
+         wins only if it scores higher.
+    The cropped threshold is padded up to a multiple of the factor before
+    shrinking, so the coarse crop starts on the same row as the full one.
+    """
+
+    def __init__(self, grid_mask, max_angle, angle_step, max_shift, sparse=False,
+                 levels=PYRAMID_LEVELS):
+        self.grid_mask = grid_mask
+        self.scorer = SparseGridScorer(grid_mask) if sparse else None
+        self.max_angle = max_angle
+        self.angle_step = angle_step
+        self.max_shift = max_shift
+        self.factor = 2 ** levels
+        self.coarse_step = angle_step * 2 ** (levels - 1)
+        self.coarse_mask = downsample_binary(grid_mask, self.factor)
+
+    def _coarse(self, sat_thresh, y_off):
+        f = self.factor
+        # pad the crop back to a row that is a multiple of f, so coarse row 0
+        # is full row y_c·f exactly (y_off // f alone is up to f − 1 px off)
+        pad = y_off % f
+        y_c = (y_off - pad) // f
+        sat_c = downsample_binary(cv2.copyMakeBorder(sat_thresh, pad, 0, 0, 0, cv2.BORDER_CONSTANT, value=0), f)
+        rows = sat_c.shape[0]
+        sat_f = sat_c.astype(np.float32)
+        best_score = -1
+        best_params = (0.0, 0.0, 0.0)
+        for theta in theta_range(self.max_angle, self.coarse_step):
+            rot = rotate_image(self.coarse_mask, theta, interp=cv2.INTER_NEAREST)
+            crop = rot[y_c:y_c + rows, :]
+            dx, dy = phase_correlate(crop, sat_f)
+            dx, dy = clamp_shift(dx, dy, self.max_shift / f)
+            aligned = translate_image(rot, dx, dy, interp=cv2.INTER_NEAREST)
+            overlap = cv2.countNonZero(cv2.bitwise_and(aligned[y_c:y_c + rows, :], sat_c))
+            if overlap > best_score:
+                best_score = overlap
+                best_params = (float(theta), dx * f, dy * f)
+        return best_params
+
+    def match(self, sat_thresh, y_off):
+        """Return best (θ, dx, dy, score), like match_grid_to_satellite."""
+        theta_c, dx_c, dy_c = self._coarse(sat_thresh, y_off)
+        k = int(round(self.coarse_step / self.angle_step))
+        thetas = np.clip(theta_c + np.arange(-k, k + 1) * self.angle_step,
+                         -self.max_angle, self.max_angle)
+
+        sat_f = sat_thresh.astype(np.float32)
+        best_score = -1
+        best_params = (0.0, 0.0, 0.0)
+        for theta in np.unique(thetas):
+            rot = rotated_mask(self.grid_mask, theta)
+            dx, dy = clamp_shift(*phase_correlate(rot[y_off:, :], sat_f), self.max_shift)
+            overlap = _score(self.scorer, rot, theta, dx, dy, sat_thresh, y_off)
+            if abs(dx - dx_c) > self.factor or abs(dy - dy_c) > self.factor:
+                # full‐res peak far from the coarse one: keep whichever scores higher
+                cx, cy = clamp_shift(dx_c, dy_c, self.max_shift)
+                coarse = _score(self.scorer, rot, theta, cx, cy, sat_thresh, y_off)
+                if coarse > overlap:
+                    dx, dy, overlap = cx, cy, coarse
+            if overlap > best_score:
+                best_score = overlap
+                best_params = (float(theta), dx, dy)
+        return (*best_params, best_score)
+
+
+class AlignmentTracker:
+    """
+    Seeds each frame's search from the previous accepted (θ, dx, dy): only
+    θ ± TRACK_ANGLE_WINDOW is swept and the shift is held within
+    TRACK_SHIFT_WINDOW of the previous one.  If that narrow search scores
+    below TRACK_MIN_RATIO × the score of the last full search, the wrapped
+    matcher runs its full ±max_angle / ±max_shift search instead.
+    Frames must be fed in time order.
+    """
+
+    def __init__(self, matcher, angle_window=TRACK_ANGLE_WINDOW,
+                 shift_window=TRACK_SHIFT_WINDOW, min_ratio=TRACK_MIN_RATIO):
+        self.matcher = matcher
+        self.grid_mask = matcher.grid_mask
+        self.scorer = matcher.scorer
+        self.angle_window = angle_window
+        self.shift_window = shift_window
+        self.min_ratio = min_ratio
+        self.prev = None
+        self.ref_score = None
+        self.full_searches = 0
+
+    def reset(self):
+        self.prev = None
+        self.ref_score = None
+
+    def seed(self, result):
+        """Adopt a full‐search (θ, dx, dy, score) found elsewhere, e.g. by score_masks."""
+        self.prev = result[:3]
+        self.ref_score = result[3]
+
+    def _narrow(self, sat_thresh, y_off):
+        theta0, dx0, dy0 = self.prev
+        m = self.matcher
+        thetas = np.clip(theta0 + theta_range(self.angle_window, m.angle_step),
+                         -m.max_angle, m.max_angle)
+        sat_f = sat_thresh.astype(np.float32)
+        best_score = -1
+        best_params = (0.0, 0.0, 0.0)
+        for theta in np.unique(thetas):
+            rot = rotated_mask(self.grid_mask, theta)
+            dx, dy = phase_correlate(rot[y_off:, :], sat_f)
+            dx = max(dx0 - self.shift_window, min(dx0 + self.shift_window, dx))
+            dy = max(dy0 - self.shift_window, min(dy0 + self.shift_window, dy))
+            dx, dy = clamp_shift(dx, dy, m.max_shift)
+            overlap = _score(self.scorer, rot, theta, dx, dy, sat_thresh, y_off)
+            if overlap > best_score:
+                best_score = overlap
+                best_params = (float(theta), dx, dy)
+        return (*best_params, best_score)
+
+    def match(self, sat_thresh, y_off):
+        """Return best (θ, dx, dy, score), like match_grid_to_satellite."""
+        if self.prev is not None:
+            result = self._narrow(sat_thresh, y_off)
+            if result[3] >= self.min_ratio * self.ref_score:
+                self.prev = result[:3]
+                return result
+        result = self.matcher.match(sat_thresh, y_off)
+        self.full_searches += 1
+        self.prev = result[:3]
+        self.ref_score = result[3]
+        return result
+
+
+def score_masks(matchers, sat_thresh, y_off):
+    """
+    Align several candidate masks (key → matcher) against one frame in a
+    single pass.  FFTGridMatchers of the same DFT size share one satellite
+    spectrum, so the frame is transformed once however many masks there are.
+    Returns key → (θ, dx, dy, score); the winner's tuple is the alignment,
+    no second search needed.
+    """
+    specs = {}
+    results = {}
+    for key, matcher in matchers.items():
+        if isinstance(matcher, FFTGridMatcher):
+            matcher._prepare(y_off)
+            spec = specs.get(matcher._dft_shape)
+            if spec is None:
+                spec = specs[matcher._dft_shape] = matcher.sat_spectrum(sat_thresh, y_off)
+            results[key] = matcher.match(sat_thresh, y_off, sat_spec=spec)
+        else:
+            results[key] = matcher.match(sat_thresh, y_off)
+    return results
+
+
+MATCHERS = {
+    "fft": FFTGridMatcher,
+    "fourier_mellin": FourierMellinMatcher,
+    "pyramid": PyramidMatcher,
+}
+_MATCHERS = {}
+
+
+def get_matcher(grid_mask, mode, max_angle, angle_step, max_shift, track=False,
+                sparse=False):
+    """
+    One matcher per loaded mask, ALIGN_MODE and sweep setting, shared for the
+    life of the process so its cached spectra carry over from frame to frame.
+    With track=True the matcher comes wrapped in a per‐mask AlignmentTracker;
+    sparse=True scores candidates with a SparseGridScorer.
+    """
+    key = (id(grid_mask), mode, max_angle, angle_step, max_shift, track, sparse)
+    matcher = _MATCHERS.get(key)
+    if matcher is None or matcher.grid_mask is not grid_mask:
+        if track:
+            inner = get_matcher(grid_mask, mode, max_angle, angle_step, max_shift,
+                                sparse=sparse)
+            matcher = AlignmentTracker(inner)
+        else:
+            matcher = MATCHERS[mode](grid_mask, max_angle, angle_step, max_shift,
+                                     sparse=sparse)
+        _MATCHERS[key] = matcher
+    return matcher
+
+
+_SCORERS = {}
+
+
+def get_scorer(grid_mask):
+    """Shared SparseGridScorer per loaded mask (for the scripts' own loops)."""
+    scorer = _SCORERS.get(id(grid_mask))
+    if scorer is None or scorer.grid_mask is not grid_mask:
+        scorer = SparseGridScorer(grid_mask)
+        _SCORERS[id(grid_mask)] = scorer
+    return scorer
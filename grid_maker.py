@@ -2,6 +2,7 @@ import cv2
 import numpy as np
 import glob
 import os
+import multiprocessing as mp
 
 # ──────────────────────────────────────────────────────────────────────────────
 # USER SETTINGS
@@ -10,26 +11,23 @@ OUTPUT_PATH = f"images/static_overlay_mask.png"
 THRESHOLD_BRIGHT = 180                 # any pixel >180 will be “white overlay”
 MORPH_KERNEL_SIZE = 3                  # for optional noise cleanup
 DILATE_ITERATIONS = 1                  # to ensure thin lines are connected
+MODE = "intersection"                  # "intersection": set in every frame; "vote": in ≥ VOTE_FRACTION of them
+VOTE_FRACTION = 0.9                    # for MODE = "vote"
+WORKERS = 1                            # processes; each folds its share of frames, then the parent merges
+SHARDS_PER_WORKER = 4                  # file shards handed to each worker (keeps the pool busy at the tail)
+# ──────────────────────────────────────────────────────────────────────────────
+#   Masks are folded into a running result as each frame is produced (an AND
+#   for "intersection", a per‐pixel uint16 count for "vote"), so memory stays
+#   at one accumulator per worker whatever the number of frames.
 # ──────────────────────────────────────────────────────────────────────────────
 
-# 1) FIND ALL PNG FILES IN IMG_FOLDER
-image_files = sorted(glob.glob(os.path.join(IMG_FOLDER, "*.png")))
-if len(image_files) == 0:
-    raise RuntimeError(f"No PNGs found in {IMG_FOLDER!r}")
-
-# 2) LOAD THE FIRST IMAGE TO GET TARGET DIMENSIONS & CENTER
-sample = cv2.imread(image_files[0])
-if sample is None:
-    raise RuntimeError(f"Could not load {image_files[0]}")
-height, width = sample.shape[:2]
-center_target = (width // 2, height // 2)
 
 # This function returns (cx, cy) = the pixel‐coordinates of the globe's center
-def find_globe_center(img_bgr):
+def find_globe_center(img_bgr, center_target):
     """
     1) Convert to grayscale, threshold to separate outer black background.
     2) Invert, find largest contour, and compute its centroid.
-    3) Return (cx, cy). If something fails, return (width/2, height/2) as fallback.
+    3) Return (cx, cy). If something fails, return center_target as fallback.
     """
     gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
     # ANY pixel darker than 10 is almost certainly “background outside the globe.”
@@ -49,16 +47,15 @@ def find_globe_center(img_bgr):
     return (cx, cy)
 
 
-# 3) LOOP OVER ALL IMAGES, ALIGN + THRESHOLD + STORE THE OVERLAY MASK
-all_masks = []  # will hold one binary mask per image
-
-for img_path in image_files:
+def overlay_mask(img_path, height, width):
+    """Steps 3a–3f for one image: re‐centre, threshold, clean, dilate."""
     img = cv2.imread(img_path)
     if img is None or img.shape[:2] != (height, width):
         raise RuntimeError(f"Image {img_path!r} missing or wrong size. All must be {height}×{width}.")
+    center_target = (width // 2, height // 2)
 
     # 3a) Find this image’s globe center
-    (cx_img, cy_img) = find_globe_center(img)
+    (cx_img, cy_img) = find_globe_center(img, center_target)
 
     # 3b) Compute how far to shift (to bring this center → target_center)
     dx = center_target[0] - cx_img
@@ -80,18 +77,92 @@ for img_path in image_files:
 
     # 3f) Dilate once so that even thin gridlines become fully covered
     dil_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-    final_mask = cv2.dilate(cleaned, dil_kernel, iterations=DILATE_ITERATIONS)
+    return cv2.dilate(cleaned, dil_kernel, iterations=DILATE_ITERATIONS)
 
-    all_masks.append(final_mask)
 
-    print(f"  • Processed {os.path.basename(img_path)} → found {np.count_nonzero(final_mask)} white overlay pixels.")
-
-# 4) COMPUTE PIXEL-WISE AND ACROSS ALL MASKS
-# Initialize intersection_mask = the first image’s mask, then AND with each subsequent
-intersection_mask = all_masks[0].copy()
-for m in all_masks[1:]:
-    intersection_mask = cv2.bitwise_and(intersection_mask, m)
+class MaskAccumulator:
+    """
+    Running combination of 0/255 masks: `inter` is the AND of every mask
+    added, `votes` (MODE "vote" only) how many of them set each pixel.
+    Partial accumulators from different workers merge() into one.
+    """
 
-# 5) SAVE THE RESULT
-cv2.imwrite(OUTPUT_PATH, intersection_mask)
-print(f"\nSaved static overlay mask (intersection of {len(all_masks)} images) as:\n  {OUTPUT_PATH}")
+    def __init__(self, shape, mode=MODE):
+        self.mode = mode
+        self.count = 0
+        self.inter = np.full(shape, 255, np.uint8) if mode == "intersection" else None
+        self.votes = np.zeros(shape, np.uint16) if mode == "vote" else None
+
+    def add(self, mask):
+        if self.inter is not None:
+            cv2.bitwise_and(self.inter, mask, dst=self.inter)
+        if self.votes is not None:
+            self.votes += mask > 0
+        self.count += 1
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.inter is not None:
+            cv2.bitwise_and(self.inter, other.inter, dst=self.inter)
+        if self.votes is not None:
+            self.votes += other.votes
+        self.count += other.count
+
+    def result(self, fraction=VOTE_FRACTION):
+        if self.mode == "intersection":
+            return self.inter.copy()
+        need = int(np.ceil(fraction * self.count))
+        return np.where(self.votes >= max(need, 1), 255, 0).astype(np.uint8)
+
+
+def fold_shard(args):
+    """Worker: one accumulator over a list of image paths."""
+    paths, height, width, mode = args
+    acc = MaskAccumulator((height, width), mode)
+    for img_path in paths:
+        final_mask = overlay_mask(img_path, height, width)
+        acc.add(final_mask)
+        print(f"  • Processed {os.path.basename(img_path)} → found {np.count_nonzero(final_mask)} white overlay pixels.")
+    return acc
+
+
+def build_mask(image_files, height, width, mode=MODE, workers=WORKERS):
+    """Folds every image's overlay mask into one MaskAccumulator."""
+    total = MaskAccumulator((height, width), mode)
+    if workers <= 1:
+        total.merge(fold_shard((image_files, height, width, mode)))
+        return total
+    n = min(len(image_files), workers * SHARDS_PER_WORKER)
+    shards = [(image_files[i::n], height, width, mode) for i in range(n)]
+    with mp.Pool(workers) as pool:
+        for part in pool.imap_unordered(fold_shard, shards):
+            total.merge(part)
+    return total
+
+
+def main():
+    # 1) FIND ALL PNG FILES IN IMG_FOLDER
+    image_files = sorted(glob.glob(os.path.join(IMG_FOLDER, "*.png")))
+    if len(image_files) == 0:
+        raise RuntimeError(f"No PNGs found in {IMG_FOLDER!r}")
+
+    # 2) LOAD THE FIRST IMAGE TO GET TARGET DIMENSIONS
+    sample = cv2.imread(image_files[0])
+    if sample is None:
+        raise RuntimeError(f"Could not load {image_files[0]}")
+    height, width = sample.shape[:2]
+
+    # 3) LOOP OVER ALL IMAGES, ALIGN + THRESHOLD, FOLDING EACH MASK IN AS IT'S MADE
+    # 4) …AND THE PIXEL-WISE AND (OR VOTE COUNT) ACROSS ALL MASKS COMES OUT OF THE FOLD
+    acc = build_mask(image_files, height, width, MODE, WORKERS)
+    result = acc.result(VOTE_FRACTION)
+
+    # 5) SAVE THE RESULT
+    cv2.imwrite(OUTPUT_PATH, result)
+    how = "intersection" if MODE == "intersection" else f"≥{VOTE_FRACTION:.0%} vote"
+    print(f"\nSaved static overlay mask ({how} of {acc.count} images) as:\n  {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
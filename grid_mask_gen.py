@@ -0,0 +1,205 @@
+import os
+import re
+import time
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Renders the lat/lon grid overlay of a geostationary frame from its
+#   subpoint, instead of the hand‐averaged mask PNGs (masks/mask0.5N135.0W2.png
+#   …).  Grid points go through the standard geostationary view geometry
+#   (WGS84 Earth, satellite GEO_RADIUS km from the centre above the subpoint,
+#   a small latitude from inclination included) to scan angles, which are
+#   scaled so the Earth's limb lands on a circle of disk_radius px.  Lines are
+#   drawn as anti‐alias‐free polylines, so the result is the usual 0/255 mask.
+#
+#   Masks are cached per (subpoint, size, thickness, geometry) for the process
+#   and returned read‐only, so the heal scripts can ask for one per frame.
+#   The geometry (disk radius / centre) has to match the scans; alignment
+#   only searches rotation and shift, not scale.
+#
+#   Run directly to write SUBPOINTS as white‐on‐transparent PNGs like
+#   mask_maker.py's, with the render time of each.
+# ───────────────────────────────────────────────────────────────────────────────
+
+FRAME_SIZE = (2000, 2000)
+DISK_RADIUS = 880          # px from disk centre to limb in a FRAME_SIZE frame
+GRID_SPACING = 10.0        # degrees between lat/lon lines
+THICKNESS = 1              # px
+SUBPOINTS = ["5N", "0N", "5S"]           # codes as in GRID_MASK_FILES, or (lat, lon) pairs
+DEFAULT_LON = -135.0       # east‐positive longitude for codes without one ("5N")
+OUT_DIR = "images"
+
+# WGS84 / geostationary orbit, km
+EQ_RADIUS = 6378.137
+POLAR_RADIUS = 6356.7523
+GEO_RADIUS = 42164.16
+SAMPLE_STEP = 0.25         # degrees between points along each drawn line
+
+_MASKS = {}
+
+_CODE_RE = re.compile(r"(\d*\.?\d+)([NS])(?:(\d+\.?\d*)([EW]))?$")
+
+
+def parse_subpoint(code, default_lon=DEFAULT_LON):
+    """
+    (lat, lon), east‐positive degrees, from a subpoint code as used for the
+    masks: "5N" → 0.5°N (the digit is tenths, as in mask0.5N…), "0N75.0W" →
+    0°, −75°; a leading "mask" and "0." are accepted too ("mask0.5S135.0W").
+    """
+    s = code.upper()
+    if s.startswith("MASK"):
+        s = s[4:]
+    m = _CODE_RE.match(s)
+    if not m:
+        raise ValueError(f"Bad subpoint code '{code}'")
+    lat_s, ns, lon_s, ew = m.groups()
+    lat = float(lat_s) if "." in lat_s else int(lat_s) / 10.0
+    lat = -lat if ns == "S" else lat
+    if lon_s is None:
+        return lat, default_lon
+    lon = float(lon_s)
+    return lat, -lon if ew == "W" else lon
+
+
+def _deg(tok):
+    """Degrees from '12.5' or McIDAS 'D:M:S' / 'D:M' text."""
+    sign = -1.0 if tok.strip().startswith("-") else 1.0
+    parts = [abs(float(p)) for p in tok.strip().lstrip("+-").split(":")]
+    return sign * sum(p / 60.0 ** i for i, p in enumerate(parts))
+
+
+def load_sbpt(path, west_positive=True):
+    """
+    {(year, doy): (lat, lon)} from a tle2subpt.py / t2st.py .sbpt file
+    ("SAT YEAR DDD LAT LON" per line).  Longitudes there are McIDAS
+    west‐positive unless west_positive=False; returned east‐positive.
+    """
+    out = {}
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            try:
+                year, doy = int(parts[1]), int(parts[2])
+                lat, lon = _deg(parts[3]), _deg(parts[4])
+            except ValueError:
+                continue
+            out[(year, doy)] = (lat, -lon if west_positive else lon)
+    return out
+
+
+def _ecef(lat, lon):
+    """Geodetic degrees → Earth‐centred km on the WGS84 ellipsoid."""
+    phi, lam = np.radians(lat), np.radians(lon)
+    e2 = 1.0 - (POLAR_RADIUS / EQ_RADIUS) ** 2
+    n = EQ_RADIUS / np.sqrt(1.0 - e2 * np.sin(phi) ** 2)
+    return np.stack([n * np.cos(phi) * np.cos(lam),
+                     n * np.cos(phi) * np.sin(lam),
+                     n * (1.0 - e2) * np.sin(phi)], axis=-1)
+
+
+def _view(sub_lat, sub_lon):
+    """Satellite position and its (toward Earth, east, north) unit axes."""
+    phi, lam = np.radians(sub_lat), np.radians(sub_lon)
+    up = np.array([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)])
+    east = np.array([-np.sin(lam), np.cos(lam), 0.0])
+    north = np.cross(up, east)
+    return GEO_RADIUS * up, -up, east, north
+
+
+def project(lat, lon, sub_lat, sub_lon):
+    """
+    Scan angles (x east, y north; radians) of lat/lon points seen from the
+    satellite over (sub_lat, sub_lon), and whether each point faces it.
+    """
+    sat, fwd, east, north = _view(sub_lat, sub_lon)
+    p = _ecef(lat, lon)
+    d = p - sat
+    depth = d @ fwd
+    x = np.arctan2(d @ east, depth)
+    y = np.arctan2(d @ north, depth)
+    # Facing the satellite: ellipsoid normal points back along the ray
+    normal = p / np.array([EQ_RADIUS, EQ_RADIUS, POLAR_RADIUS]) ** 2
+    visible = np.einsum("...i,...i->...", normal, d) < 0
+    return x, y, visible
+
+
+def _lines(sub_lat, sub_lon, spacing):
+    """(lat, lon) sample arrays along every parallel and meridian in view."""
+    lats = np.arange(-90 + spacing, 90, spacing)
+    lons = np.arange(-180, 180, spacing)
+    along = np.arange(-90, 90 + SAMPLE_STEP / 2, SAMPLE_STEP)
+    lines = []
+    for lat in lats:  # parallels: the visible hemisphere is ±90° of sub_lon
+        lines.append((np.full_like(along, lat), sub_lon + along))
+    for lon in lons:  # meridians
+        if abs((lon - sub_lon + 180) % 360 - 180) < 90:
+            lines.append((along, np.full_like(along, lon)))
+    return lines
+
+
+def render_grid_mask(sub_lat, sub_lon, size=FRAME_SIZE, thickness=THICKNESS,
+                     disk_radius=DISK_RADIUS, center=None, spacing=GRID_SPACING):
+    """
+    Single‐channel 0/255 grid mask of the lat/lon lines every `spacing`
+    degrees for a satellite over (sub_lat, sub_lon), in a size = (w, h)
+    frame with the Earth disk centred on `center` (default: frame centre)
+    and its equatorial limb disk_radius px out.
+    """
+    w, h = size
+    cx, cy = center if center is not None else (w / 2.0, h / 2.0)
+    limb = np.arcsin(EQ_RADIUS / GEO_RADIUS)
+    scale = disk_radius / np.tan(limb)
+    frac = 16  # cv2 fixed‐point: 4 fractional bits of sub‐pixel position
+    mask = np.zeros((h, w), np.uint8)
+    polys = []
+    for lat, lon in _lines(sub_lat, sub_lon, spacing):
+        x, y, vis = project(lat, lon, sub_lat, sub_lon)
+        px = np.round((cx + scale * np.tan(x)) * frac).astype(np.int32)
+        py = np.round((cy - scale * np.tan(y)) * frac).astype(np.int32)
+        pts = np.stack([px, py], axis=1)
+        # split into runs of visible points
+        edges = np.flatnonzero(np.diff(vis.astype(np.int8))) + 1
+        for run in np.split(np.arange(len(vis)), edges):
+            if len(run) > 1 and vis[run[0]]:
+                polys.append(pts[run])
+    cv2.polylines(mask, polys, False, 255, thickness, cv2.LINE_8, shift=4)
+    return mask
+
+
+def grid_mask(subpoint, size=FRAME_SIZE, thickness=THICKNESS,
+              disk_radius=DISK_RADIUS, center=None, spacing=GRID_SPACING):
+    """
+    render_grid_mask for a subpoint code ("5N", "0N75.0W") or (lat, lon)
+    pair, cached per argument set; the returned array is shared and
+    read‐only.
+    """
+    lat, lon = parse_subpoint(subpoint) if isinstance(subpoint, str) else subpoint
+    key = (round(lat, 4), round(lon, 4), tuple(size), thickness, disk_radius,
+           None if center is None else tuple(center), spacing)
+    mask = _MASKS.get(key)
+    if mask is None:
+        mask = render_grid_mask(lat, lon, size, thickness, disk_radius, center, spacing)
+        mask.flags.writeable = False
+        _MASKS[key] = mask
+    return mask
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for sub in SUBPOINTS:
+        lat, lon = parse_subpoint(sub) if isinstance(sub, str) else sub
+        t0 = time.perf_counter()
+        mask = render_grid_mask(lat, lon, FRAME_SIZE, THICKNESS)
+        dt = time.perf_counter() - t0
+        name = f"gen_mask{abs(lat):.1f}{'N' if lat >= 0 else 'S'}{abs(lon):.1f}{'E' if lon >= 0 else 'W'}.png"
+        rgba = np.zeros(mask.shape + (4,), np.uint8)
+        rgba[mask > 0] = (255, 255, 255, 255)
+        cv2.imwrite(os.path.join(OUT_DIR, name), rgba)
+        print(f"{name}: {int(np.count_nonzero(mask))} px in {dt * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
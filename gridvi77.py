@@ -4,8 +4,13 @@ import json
 import glob
 import numpy as np
 from datetime import date, timedelta
-from rembg import remove, new_session
-from PIL import Image
+import rembg_service
+import rembg_matte
+from grid_align import (get_matcher, compose_affine, unalign_matrix,
+                        translate_matrix, warp_frame)
+from align_store import AlignmentStore, STORE_NAME, file_digest, mask_digest, settings_key
+from inpaint_backends import inpaint, apply_matte
+from mask_store import load_mask, dilated_mask, set_cache_dir
 
 # ───────────────────────────────────────────────────────────────────────────────
 #                          U S E R   CONFIGURATION
@@ -18,12 +23,18 @@ mask_filename = "mask1px4.png"
 INPUT_BASE     = "/ships22/sds/goes/digitized/"  # base directory for satellite data
 OUTPUT_ROOT    = os.path.join(INPUT_BASE, f"32A/vissr/{YEAR}/grid_aligned/aligned_output1px_vi/")   # root for all outputs
 GRID_PATH      = os.path.join(INPUT_BASE, f"masks/{mask_filename}") # transparent‐RGBA grid mask
+MASK_CACHE_DIR = None  # e.g. os.path.join(INPUT_BASE, "masks/.cache"): dilations/rotations reused across runs (mask_store.py)
 
 # Alignment parameters
 BRIGHT_THRESH  = 180     # threshold to isolate grid pixels
 MAX_ANGLE      = 2.2       # ±° to search when aligning grid
 ANGLE_STEP     = 0.1     # θ step in degrees
 MAX_SHIFT      = 200     # ± pixels to allow translation
+ALIGN_MODE     = "sweep" # "sweep" (per‐θ loop), or grid_align.py "fft" / "fourier_mellin" / "pyramid"
+                         # ("fft" is opt‐in: it caches ~0.9 GB of rotated masks + spectra, mask_store.py)
+TRACK_FRAMES   = False   # seed θ/dx/dy from the previous frame; full search on low score (unvalidated, opt‐in)
+SPARSE_SCORING = False   # score candidates from the mask pixel list (grid_align.SparseGridScorer); shifts still use full-frame phase correlation
+USE_ALIGN_STORE = True   # reuse θ/dx/dy from earlier runs on the same input (align_store.py)
 
 # Green‐fill parameters
 THICKEN_PIXELS = 3       # dilate grid mask by this thickness
@@ -31,7 +42,12 @@ GREEN          = np.array((0, 255, 0), dtype=np.uint8)
 
 # Background removal
 USE_REMBG      = True    # remove background before alignment
-REMBG_SESSION  = new_session("unet")
+REMBG_SERVICE  = None    # e.g. rembg_service.ADDRESS: share one model with other runs (rembg_service.py)
+REMBG_SESSION  = rembg_service.session("unet", REMBG_SERVICE)
+REMBG_SCALE    = 1.0     # run rembg on a copy this size, upsample the matte (rembg_matte.py)
+REMBG_REFINE   = False   # re‐threshold the upsampled matte's edge at full resolution
+MATTE_METHOD   = "rembg" # "geometric": fit the limb ellipse (disk_segment.py), rembg only if the fit is poor
+MATTE_CACHE_DIR = None  # e.g. os.path.join(OUTPUT_ROOT, ".matte_cache"): reuse mattes of identical frames across runs
 
 # Dates & Sat info
 MAIN_SAT       = "32A"   # primary satellite code
@@ -44,6 +60,8 @@ FOURCC         = cv2.VideoWriter_fourcc(*'mp4v')
 
 # Flags
 RECENTER_DISK  = False   # recenter Earth disk after alignment
+INPAINT_METHOD = "green"   # inpaint_backends.py: "green", "green_distance", "telea", "ns", …
+INPAINT_RADIUS = 6         # for the radius‐based methods (telea / ns)
 SAVE_DEBUG     = True    # save per‐frame debug images
 SAVE_FULL_DEBUG= False   # save every θ‐rotated mask image
 
@@ -74,21 +92,6 @@ vid_no_bg_inpainted = cv2.VideoWriter(OS_FOLDERS["video_no_bg_inpainted"], FOURC
 #                       Helper functions for alignment & inpainting
 # ───────────────────────────────────────────────────────────────────────────────
 
-def load_grid_mask(path):
-    """
-    Loads a transparent RGBA grid (white lines on alpha=0). Returns single‐channel 0/255 mask.
-    """
-    rgba = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-    if rgba is None:
-        raise FileNotFoundError(f"Could not load '{path}'")
-    if rgba.shape[2] == 4:
-        alpha = rgba[:, :, 3]
-        mask = np.where(alpha > 0, 255, 0).astype(np.uint8)
-    else:
-        gray = cv2.cvtColor(rgba, cv2.COLOR_BGR2GRAY)
-        _, mask = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-    return mask
-
 def threshold_satellite(img_bgr, thresh, crop_top_frac=1/12):
     """
     Converts BGR→GRAY, thresholds > thresh → 255. Crops off top crop_top_frac of rows.
@@ -156,6 +159,10 @@ def match_grid_to_satellite(sat_thresh, grid_mask, frame_name, y_off):
         dbg_dir = os.path.join(OS_FOLDERS["debug"], frame_name)
         os.makedirs(dbg_dir, exist_ok=True)
         cv2.imwrite(os.path.join(dbg_dir, "sat_thresh_cropped.png"), sat_thresh)
+    if ALIGN_MODE != "sweep" and not SAVE_FULL_DEBUG:
+        matcher = get_matcher(grid_mask, ALIGN_MODE, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT,
+                              track=TRACK_FRAMES, sparse=SPARSE_SCORING)
+        return matcher.match(sat_thresh, y_off)
 
     for theta in np.arange(-MAX_ANGLE, MAX_ANGLE + 1e-5, ANGLE_STEP):
         rot_mask = rotate_image(grid_mask, theta, interp=cv2.INTER_NEAREST)
@@ -180,44 +187,29 @@ def match_grid_to_satellite(sat_thresh, grid_mask, frame_name, y_off):
 
     return (*best_params, best_score)
 
-def fill_green_once(img, green_mask):
-    h, w = green_mask.shape
-    out = img.copy()
-    changed = False
-    neigh = [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(-1,1),(1,-1),(1,1)]
-    ys, xs = np.where(green_mask)
-    for y, x in zip(ys, xs):
-        vals = []
-        for dy, dx in neigh:
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w and not green_mask[ny, nx]:
-                vals.append(img[ny, nx])
-        if vals:
-            out[y, x] = np.mean(vals, axis=0).astype(np.uint8)
-            changed = True
-    return out, changed
-
-def recursive_green_fill(img):
-    while True:
-        green_mask = np.all(img == GREEN, axis=2)
-        if not green_mask.any(): break
-        img, chg = fill_green_once(img, green_mask)
-        if not chg: break
-    return img
-
 # ───────────────────────────────────────────────────────────────────────────────
 #                 Main pipeline: alignment + outputs creation
 # ───────────────────────────────────────────────────────────────────────────────
 
 # Load grid mask once
-grid_mask = load_grid_mask(GRID_PATH)
+set_cache_dir(MASK_CACHE_DIR)
+rembg_matte.set_matte_cache(MATTE_CACHE_DIR)
+grid_mask = load_mask(GRID_PATH)
 mh, mw = grid_mask.shape
 
+# Alignment store next to OUTPUT_ROOT: results keyed by input hash + mask + settings
+ALIGN_STORE = (AlignmentStore(os.path.join(os.path.dirname(os.path.normpath(OUTPUT_ROOT)), STORE_NAME))
+               if USE_ALIGN_STORE else None)
+ALIGN_SETTINGS = settings_key(
+    mode=ALIGN_MODE, max_angle=MAX_ANGLE, angle_step=ANGLE_STEP, max_shift=MAX_SHIFT,
+    bright_thresh=BRIGHT_THRESH, rembg=USE_REMBG, track=TRACK_FRAMES, sparse=SPARSE_SCORING,
+    matte_method=MATTE_METHOD, rembg_scale=REMBG_SCALE, rembg_refine=REMBG_REFINE,
+)
+MASK_ID = mask_digest(grid_mask)
+
 # Helper to remove background via rembg (returns RGBA numpy)
 def remove_background(img_bgr):
-    pil = Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
-    rem = remove(pil, session=REMBG_SESSION).convert("RGBA")
-    return np.array(rem)
+    return rembg_matte.remove_background(img_bgr, REMBG_SESSION, REMBG_SCALE, REMBG_REFINE, MATTE_METHOD)
 
 # Process all dates
 for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
@@ -254,16 +246,24 @@ for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
             sat_rgb_nobg = sat_bgr.copy()
             alpha_ch = np.full((sat_bgr.shape[0], sat_bgr.shape[1]), 255, dtype=np.uint8)
 
-        # ── Align to grid
+        # ── Align to grid (or reuse an earlier run's result for this input)
         sat_thresh_full, y_off = threshold_satellite(sat_rgb_nobg, BRIGHT_THRESH, crop_top_frac=1/12)
-        theta, dx, dy, score = match_grid_to_satellite(sat_thresh_full, grid_mask, basefn, y_off)
-
-        # ─— Apply inverse transform to original BGR and BG‐removed
-        sat_trans_bgr = translate_image(sat_bgr, -dx, -dy, interp=cv2.INTER_LINEAR)
-        aligned_bgr   = rotate_image(sat_trans_bgr, -theta, interp=cv2.INTER_LINEAR)
+        file_hash = file_digest(img_path) if ALIGN_STORE else None
+        cached = ALIGN_STORE.get(file_hash, MASK_ID, ALIGN_SETTINGS) if ALIGN_STORE else None
+        if cached is not None:
+            theta, dx, dy, score, _ = cached
+            if TRACK_FRAMES and ALIGN_MODE != "sweep":
+                get_matcher(grid_mask, ALIGN_MODE, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT,
+                            track=True, sparse=SPARSE_SCORING).seed((theta, dx, dy, score))
+        else:
+            theta, dx, dy, score = match_grid_to_satellite(sat_thresh_full, grid_mask, basefn, y_off)
+            if ALIGN_STORE:
+                ALIGN_STORE.put(file_hash, MASK_ID, ALIGN_SETTINGS, theta, dx, dy, score, frame=basefn,
+                                shape=sat_bgr.shape)
 
-        sat_trans_nobg = translate_image(sat_rgb_nobg, -dx, -dy, interp=cv2.INTER_LINEAR)
-        aligned_nobg   = rotate_image(sat_trans_nobg, -theta, interp=cv2.INTER_LINEAR)
+        # ─— Apply inverse transform (and recentering) to original BGR and BG‐removed,
+        #    composed into one affine so each buffer is resampled exactly once
+        M = unalign_matrix(theta, dx, dy, sat_bgr.shape)
 
         # If recentering:
         if RECENTER_DISK:
@@ -271,8 +271,13 @@ for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
             cx, cy = find_earth_center(rot_for_center)
             tx = (mw/2.0) - cx
             ty = (mh/2.0) - cy
-            aligned_bgr  = translate_image(aligned_bgr,  tx,  ty, interp=cv2.INTER_LINEAR)
-            aligned_nobg = translate_image(aligned_nobg, tx,  ty, interp=cv2.INTER_LINEAR)
+            M = compose_affine(M, translate_matrix(tx, ty))
+
+        # The no‐background copies are the aligned frame under the aligned
+        # matte, so only the frame and its single‐channel alpha are warped
+        aligned_bgr   = warp_frame(sat_bgr, M, interp=cv2.INTER_LINEAR)
+        aligned_alpha = warp_frame(alpha_ch, M, interp=cv2.INTER_LINEAR)
+        aligned_nobg  = apply_matte(aligned_bgr, aligned_alpha, rgb=USE_REMBG)
 
         # ── “With gridlines” = just the aligned BGR (grid was overlaid originally)
         out_with_grid_path = os.path.join(OS_FOLDERS["folder_aligned_with_grid"], basefn + ".png")
@@ -284,22 +289,19 @@ for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
 
         # ── Create “green‐marked” version
         # First thicken grid_mask, then mark those pixels green on aligned_bgr
-        kernel_t = cv2.getStructuringElement(cv2.MORPH_RECT, (THICKEN_PIXELS, THICKEN_PIXELS))
-        thick_mask = cv2.dilate(grid_mask, kernel_t, iterations=1)
+        thick_mask = dilated_mask(grid_mask, THICKEN_PIXELS)
         aligned_green = aligned_bgr.copy()
         aligned_green[thick_mask > 0] = GREEN
         out_green_path = os.path.join(OS_FOLDERS["folder_aligned_green"], basefn + ".png")
         cv2.imwrite(out_green_path, aligned_green)
 
-        # ── Create “no gridlines” = recursive‐green‐fill on aligned_green
-        filled = recursive_green_fill(aligned_green.copy())
+        # ── Create “no gridlines” = INPAINT_METHOD over thick_mask (default: the green fill)
+        filled = inpaint(aligned_bgr, thick_mask, INPAINT_METHOD, INPAINT_RADIUS)
         out_no_grid_path = os.path.join(OS_FOLDERS["folder_aligned_no_grid"], basefn + ".png")
         cv2.imwrite(out_no_grid_path, filled)
 
-        # ── For “no background, inpainted” video: apply green‐fill to aligned_nobg
-        aligned_nobg_green = aligned_nobg.copy()
-        aligned_nobg_green[thick_mask > 0] = GREEN
-        nobg_filled = recursive_green_fill(aligned_nobg_green.copy())
+        # ── For “no background, inpainted” video: the fill above under the matte
+        nobg_filled = apply_matte(filled, aligned_alpha, rgb=USE_REMBG)
         vid_no_bg_inpainted.write(nobg_filled)
 
         # ── Save “no grid, no background” frame
@@ -313,7 +315,7 @@ for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
             cv2.imwrite(os.path.join(dbg_dir, "aligned_with_grid.png"), aligned_bgr)
             cv2.imwrite(os.path.join(dbg_dir, "aligned_nobg_with_grid.png"), aligned_nobg)
             cv2.imwrite(os.path.join(dbg_dir, "aligned_green.png"), aligned_green)
-            cv2.imwrite(os.path.join(dbg_dir, "aligned_nobg_green.png"), aligned_nobg_green)
+            cv2.imwrite(os.path.join(dbg_dir, "aligned_nobg_green.png"), apply_matte(aligned_green, aligned_alpha, rgb=USE_REMBG))
             cv2.imwrite(os.path.join(dbg_dir, "filled.png"), filled)
             cv2.imwrite(os.path.join(dbg_dir, "nobg_filled.png"), nobg_filled)
             # Save the thresholded satellite crop
@@ -324,5 +326,7 @@ for doy in range(START_DAY, (366 if YEAR % 4 == 0 else 365) + 1):
 # Release video writers
 vid_no_bg_with_grid.release()
 vid_no_bg_inpainted.release()
+if ALIGN_STORE:
+    ALIGN_STORE.close()
 
 print("\nAll done. Outputs written to:", OUTPUT_ROOT)
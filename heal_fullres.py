@@ -0,0 +1,178 @@
+import os
+import sys
+import cv2
+import numpy as np
+from datetime import date, timedelta
+from grid_align import scale_alignment, unalign_matrix, warp_frame
+from align_store import AlignmentStore, STORE_NAME, file_digest, mask_digest
+from mask_store import load_mask, dilated_mask
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Heals the full‐resolution scans (.tiff, or the .raw files raw2area.py
+#   turns into AREA files) using the alignment telea_heal_subpoint.py already
+#   found on the matching .vi.med.png preview.  The preview's θ and normalised
+#   shift are read from the alignment store by the preview's hash, rescaled to
+#   the scan's size and applied as one warp; the grid mask is scaled up the
+#   same way and inpainted.  No grid search runs at full resolution.
+#
+#   Several scripts share the store (gridvi77.py aligns the same previews
+#   against its own mask, with no subpoint), so only rows aligned against one
+#   of GRID_MASKS — that subpoint's own mask, or the whole set when the
+#   subpoint was picked while aligning — are replayed, newest first.
+# ───────────────────────────────────────────────────────────────────────────────
+
+# --- Configuration ---
+DIR = "/ships22/sds/goes/digitized"
+YEAR = 1978
+START_DAY = 1
+MAIN_SAT = "32A"
+ALT_SAT = "33A"
+ALT_SAT2 = "35A"
+
+PREVIEW_EXT = ".vi.med.png"
+SOURCE_EXTS = (".vi.tiff", ".vi.raw")  # first one found next to the preview is used
+RAW_LINES = 12109       # .raw scans are headerless LINES × ELEMENTS (raw2area.py)
+RAW_ELEMENTS = 12109
+
+# Grid masks (preview resolution) for different subpoints
+GRID_MASK_FILES = {
+    "5N": os.path.join(DIR, "masks/mask0.5N135.0W2.png"),
+    "0N": os.path.join(DIR, "masks/mask0.0N135.0W.png"),
+    "5S": os.path.join(DIR, "masks/mask0.5S135.0W.png"),
+}
+PREVIEW_SIZE = (2000, 2000)  # FRAME_SIZE the masks and previews were aligned at
+
+# In preview pixels, like telea_heal_subpoint.py; scaled up per scan
+INPAINT_RADIUS = 6
+DILATE_PIXELS = 5
+
+# Same store telea_heal_subpoint.py writes to
+ALIGN_STORE_PATH = os.path.join(
+    DIR, f"{MAIN_SAT}/vissr/{YEAR}/grid_aligned", STORE_NAME
+)
+OUTPUT_ROOT = os.path.join(
+    DIR,
+    f"{MAIN_SAT}/vissr/{YEAR}/grid_aligned/aligned_output_vi_fullres"
+)
+OUTPUT_LOG = os.path.join(OUTPUT_ROOT, "output.txt")
+FOLDER_NO_GRID = os.path.join(OUTPUT_ROOT, "aligned_no_grid")
+
+
+class Tee:
+    def __init__(self, filename):
+        self.file = open(filename, "w", encoding="utf-8")
+        self.stdout = sys.stdout
+
+    def write(self, data):
+        self.file.write(data)
+        self.stdout.write(data)
+
+    def flush(self):
+        self.file.flush()
+        self.stdout.flush()
+
+
+# --- Helper functions ---
+
+def load_source(path):
+    """Full‐resolution scan as an array; .raw is 8‐ or 16‐bit by file size."""
+    if path.endswith(".raw"):
+        n = RAW_LINES * RAW_ELEMENTS
+        size = os.path.getsize(path)
+        dtype = np.uint8 if size == n else np.uint16
+        if size != n * np.dtype(dtype).itemsize:
+            return None
+        return np.fromfile(path, dtype=dtype).reshape(RAW_LINES, RAW_ELEMENTS)
+    return cv2.imread(path, cv2.IMREAD_UNCHANGED)
+
+
+def doy_folder(year, doy):
+    return (date(year, 1, 1) + timedelta(days=doy-1)).strftime("%Y_%m_%d") + f"_{doy:03d}"
+
+
+_FULL_MASKS = {}
+
+def fullres_mask(sub, shape):
+    """
+    The subpoint's grid mask thickened as at preview size, then scaled to
+    `shape`, so the stroke is the preview's scaled up; cached per size.
+    """
+    key = (sub, shape[:2])
+    if key not in _FULL_MASKS:
+        h, w = shape[:2]
+        thick = dilated_mask(GRID_MASKS[sub], DILATE_PIXELS)
+        _FULL_MASKS[key] = cv2.resize(thick, (w, h), interpolation=cv2.INTER_NEAREST)
+    return _FULL_MASKS[key]
+
+
+def frame_tasks():
+    """(preview_path, source_path, basefn) for every scan with a preview, in time order."""
+    last_doy = 366 if YEAR % 4 == 0 else 365
+    for doy in range(START_DAY, last_doy + 1):
+        folder = doy_folder(YEAR, doy)
+        for sat in (MAIN_SAT, ALT_SAT, ALT_SAT2):
+            main_dir = os.path.join(DIR, sat, "vissr", str(YEAR), folder)
+            if os.path.isdir(main_dir):
+                break
+        else:
+            continue
+
+        for fname in sorted(os.listdir(main_dir)):
+            if not fname.lower().endswith(PREVIEW_EXT):
+                continue
+            basefn = fname.replace(PREVIEW_EXT, "")
+            for ext in SOURCE_EXTS:
+                src_path = os.path.join(main_dir, basefn + ext)
+                if os.path.isfile(src_path):
+                    yield os.path.join(main_dir, fname), src_path, basefn
+                    break
+
+
+GRID_MASKS = {k: load_mask(p) for k, p in GRID_MASK_FILES.items()}
+# mask_ids a stored row may carry for each subpoint (telea_heal_subpoint.MASK_IDS)
+_ALL_MASKS_ID = mask_digest(*GRID_MASKS.values())
+MASK_CANDIDATES = {k: (mask_digest(m), _ALL_MASKS_ID) for k, m in GRID_MASKS.items()}
+
+
+def main():
+    os.makedirs(FOLDER_NO_GRID, exist_ok=True)
+    sys.stdout = Tee(OUTPUT_LOG)
+    store = AlignmentStore(ALIGN_STORE_PATH)
+
+    for preview_path, src_path, basefn in frame_tasks():
+        file_hash = file_digest(preview_path)
+        found = store.find(file_hash, MASK_CANDIDATES)
+        if found is None:
+            other = store.find(file_hash)
+            if other is None:
+                print(f"SKIP {basefn}: no stored alignment (run telea_heal_subpoint.py first)")
+            else:
+                print(f"SKIP {basefn}: stored alignments are for other masks or have no subpoint "
+                      f"(newest: sub={other[3]})")
+            continue
+        theta, u, v, sub = found
+
+        src = load_source(src_path)
+        if src is None:
+            print(f"SKIP {basefn}: can't read {os.path.basename(src_path)}")
+            continue
+
+        # Preview alignment → this scan's pixels, then one warp + one inpaint
+        theta, dx, dy = scale_alignment(theta, u, v, src.shape)
+        aligned = warp_frame(src, unalign_matrix(theta, dx, dy, src.shape))
+        mask = fullres_mask(sub, src.shape)
+        radius = INPAINT_RADIUS * src.shape[1] / PREVIEW_SIZE[0]
+        if aligned.dtype != np.uint8:  # cv2.inpaint: 8‐bit, or 16‐bit single channel
+            aligned = aligned if aligned.ndim == 2 else (aligned / 257).astype(np.uint8)
+        filled = cv2.inpaint(aligned, mask, radius, flags=cv2.INPAINT_TELEA)
+        cv2.imwrite(os.path.join(FOLDER_NO_GRID, basefn + ".png"), filled)
+
+        print(f"Processed {basefn}: θ={theta:.2f}, dx={dx:.2f}, dy={dy:.2f}, sub={sub}, "
+              f"size={src.shape[1]}x{src.shape[0]}")
+
+    store.close()
+    print("\nAll done. Outputs written to:", OUTPUT_ROOT)
+
+
+if __name__ == "__main__":
+    main()
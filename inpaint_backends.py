@@ -0,0 +1,199 @@
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from green_fill import GREEN, green_fill
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Inpainting backends behind one call, inpaint(image_bgr, mask, method,
+#   radius), so the heal scripts pick a method by name (INPAINT_METHOD) instead
+#   of hard‐coding cv2.inpaint or the green fill.  mask is single‐channel
+#   uint8, non‐zero where the grid was.  Backends needing optional packages
+#   (scikit‐image, pyinpaint, opencv‐contrib) import them on first use and
+#   raise ImportError if they're missing; available() lists the ones that work.
+#
+#   With tile set, the frame is cut into tile × tile blocks, blocks with no
+#   mask pixel are skipped, and each remaining block is inpainted on a crop
+#   grown by a margin (default: radius) so fills near its edge still see
+#   their neighbourhood.  Only the block's own mask pixels are pasted back.
+#   The grid is one connected component spanning the frame, so blocks rather
+#   than components are what actually shrinks the work.
+#
+#   The no‐background outputs are the healed frame times rembg's alpha matte
+#   (apply_matte), so each frame is inpainted once rather than once per copy.
+#   With rembg on, those outputs keep the scripts' old R/B‐swapped order.
+# ───────────────────────────────────────────────────────────────────────────────
+
+DEFAULT_RADIUS = 6
+
+
+def inpaint_telea(image_bgr, mask, radius=DEFAULT_RADIUS):
+    """OpenCV Telea inpainting."""
+    return cv2.inpaint(image_bgr, mask, radius, flags=cv2.INPAINT_TELEA)
+
+
+def inpaint_ns(image_bgr, mask, radius=DEFAULT_RADIUS):
+    """OpenCV Navier–Stokes inpainting."""
+    return cv2.inpaint(image_bgr, mask, radius, flags=cv2.INPAINT_NS)
+
+
+def inpaint_biharmonic_color(image_bgr, mask, radius=None):
+    """
+    scikit-image biharmonic inpainting on each channel separately.
+    `mask` is a single-channel 0/255 uint8 array; we convert to boolean.
+    """
+    from skimage.restoration import inpaint_biharmonic
+    mask_bool = (mask > 0)
+    # Convert BGR→RGB float in [0,1]
+    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+    out = np.zeros_like(image_rgb)
+    for c in range(3):
+        out[:, :, c] = inpaint_biharmonic(image_rgb[:, :, c], mask_bool)
+    # Convert back to BGR uint8
+    out_bgr = (np.clip(out * 255.0, 0, 255)).astype(np.uint8)
+    return cv2.cvtColor(out_bgr, cv2.COLOR_RGB2BGR)
+
+
+def inpaint_shiftmap(image_bgr, mask, radius=None):
+    """
+    Exemplar‐based inpainting via OpenCV‐contrib’s xphoto ShiftMap.
+    xphoto's mask is the other way round: non‐zero where pixels are valid.
+    """
+    if not hasattr(cv2, "xphoto"):
+        raise ImportError("ShiftMap needs opencv-contrib-python (cv2.xphoto)")
+    dst = np.zeros_like(image_bgr)
+    valid = np.where(mask > 0, 0, 255).astype(np.uint8)
+    cv2.xphoto.inpaint(image_bgr, valid, dst, cv2.xphoto.INPAINT_SHIFTMAP)
+    return dst
+
+
+def inpaint_pyinpaint(image_bgr, mask, radius=None):
+    """pyinpaint's patch‐based Inpaint."""
+    from pyinpaint import Inpaint
+    return Inpaint(image_bgr, mask)()
+
+
+def _green(mode):
+    def inpaint_green(image_bgr, mask, radius=None):
+        """Paint the mask pure GREEN, then green_fill.py (radius unused)."""
+        marked = image_bgr.copy()
+        marked[mask > 0] = GREEN
+        return green_fill(marked, mode)
+    return inpaint_green
+
+
+BACKENDS = {
+    "telea": inpaint_telea,
+    "ns": inpaint_ns,
+    "biharmonic": inpaint_biharmonic_color,
+    "shiftmap": inpaint_shiftmap,
+    "pyinpaint": inpaint_pyinpaint,
+    "green": _green("iterative"),
+    "green_distance": _green("distance"),
+}
+
+
+TILE_MARGIN_MIN = 8  # px of context kept around a tile even for small radii
+
+
+def mask_tiles(mask, tile, margin):
+    """
+    (core, crop) slice pairs for every tile × tile block of mask that holds a
+    mask pixel; crop is core grown by margin and clipped to the frame.
+    """
+    h, w = mask.shape
+    rows = (h + tile - 1) // tile
+    cols = (w + tile - 1) // tile
+    # Mask pixels per block, in one pass over the mask
+    pad = np.zeros((rows * tile, cols * tile), np.uint8)
+    pad[:h, :w] = mask > 0
+    hits = pad.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+    tiles = []
+    for r, c in zip(*np.nonzero(hits)):
+        y0, x0 = r * tile, c * tile
+        y1, x1 = min(y0 + tile, h), min(x0 + tile, w)
+        core = (slice(y0, y1), slice(x0, x1))
+        crop = (slice(max(y0 - margin, 0), min(y1 + margin, h)),
+                slice(max(x0 - margin, 0), min(x1 + margin, w)))
+        tiles.append((core, crop))
+    return tiles
+
+
+def inpaint_tiled(image_bgr, mask, method="telea", radius=DEFAULT_RADIUS,
+                  tile=256, margin=None, workers=1):
+    """
+    inpaint() restricted to the mask's footprint: only tiles containing mask
+    pixels are inpainted (on a crop with `margin` px of context), optionally
+    on `workers` threads, and their mask pixels pasted into a copy of
+    image_bgr.
+    """
+    fn = BACKENDS[method]
+    if margin is None:
+        margin = max(int(np.ceil(radius or 0)), TILE_MARGIN_MIN)
+    out = image_bgr.copy()
+    tiles = mask_tiles(mask, tile, margin)
+
+    def run(t):
+        core, crop = t
+        healed = fn(image_bgr[crop], mask[crop], radius)
+        # core's position inside the crop
+        oy = core[0].start - crop[0].start
+        ox = core[1].start - crop[1].start
+        ch = core[0].stop - core[0].start
+        cw = core[1].stop - core[1].start
+        return core, healed[oy:oy + ch, ox:ox + cw]
+
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(run, tiles))
+    else:
+        results = map(run, tiles)
+    for core, healed in results:
+        sel = mask[core] > 0
+        out[core][sel] = healed[sel]
+    return out
+
+
+def inpaint(image_bgr, mask, method="telea", radius=DEFAULT_RADIUS, tile=None, workers=1):
+    """
+    Inpaints image_bgr where mask is set with the BACKENDS entry `method`.
+    tile: None for the whole frame in one call, or a block size for
+    inpaint_tiled (run on `workers` threads).
+    """
+    if method not in BACKENDS:
+        raise ValueError(f"Unknown inpaint method '{method}' (have: {', '.join(BACKENDS)})")
+    if tile:
+        return inpaint_tiled(image_bgr, mask, method, radius, tile=tile, workers=workers)
+    return BACKENDS[method](image_bgr, mask, radius)
+
+
+def available():
+    """Names of the BACKENDS whose optional dependencies import here."""
+    names = []
+    probe = np.zeros((8, 8, 3), np.uint8)
+    hole = np.zeros((8, 8), np.uint8)
+    hole[3:5, 3:5] = 255
+    for name, fn in BACKENDS.items():
+        try:
+            fn(probe, hole, 1)
+        except ImportError:
+            continue
+        except Exception:
+            pass  # importable; tiny probe image just isn't to its liking
+        names.append(name)
+    return names
+
+
+def apply_matte(image_bgr, alpha, rgb=False):
+    """
+    image_bgr × alpha / 255, rounded exactly as PIL's composite (what rembg's
+    cutout does to the RGB channels).  alpha None → image_bgr unchanged.
+    rgb=True returns the result in RGB order, which is how the scripts'
+    rembg cutouts (PIL RGB arrays) were always written with cv2.imwrite.
+    """
+    if alpha is None:
+        return image_bgr
+    if rgb and image_bgr.ndim == 3:
+        image_bgr = image_bgr[:, :, ::-1]
+    a = alpha[:, :, None] if image_bgr.ndim == 3 else alpha
+    t = image_bgr.astype(np.uint32) * a + 128
+    return ((t + (t >> 8)) >> 8).astype(np.uint8)
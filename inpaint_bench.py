@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import multiprocessing as mp
+import cv2
+import numpy as np
+from inpaint_backends import BACKENDS, inpaint
+from mask_store import load_mask, dilated_mask
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+    import tracemalloc
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Runs every inpainting backend on the same aligned frame + grid mask and
+#   prints wall time, peak memory and quality side by side, whole‐frame and
+#   tiled ("method@tile", inpaint_backends.inpaint_tiled).
+#
+#   Quality needs ground truth, which the real grid pixels don't have, so
+#   each backend also inpaints a probe: the thickened grid shifted by
+#   PROBE_SHIFT onto pixels that are known, minus any real grid.  PSNR / MAE
+#   are measured on those probe pixels against the original frame.
+#
+#   Each backend runs in its own fresh process, so peak memory is that
+#   process's max RSS: the same interpreter + cv2 + frame baseline for every
+#   row, plus whatever the backend imports and allocates (Linux / macOS;
+#   tracemalloc elsewhere, which only sees numpy allocations).
+# ───────────────────────────────────────────────────────────────────────────────
+
+IMAGE_PATH     = "aligned_with_grid.png"   # an aligned frame (e.g. aligned_with_grid/*.png)
+GRID_PATH      = "images/grid.5N.png"      # grid mask it was aligned to
+THICKEN_PIXELS = 5
+INPAINT_RADIUS = 6
+PROBE_SHIFT    = (45, 45)                  # px; half a grid cell keeps it off the lines
+METHODS        = list(BACKENDS)            # or e.g. ["telea", "ns", "green_distance"]
+TILES          = (None, 256)               # whole frame and/or inpaint_tiled block sizes
+THREADS        = 1                         # threads for tiled runs
+CSV_PATH       = None                      # also write the table here if set
+
+
+def probe_mask(thick_mask, shift):
+    """thick_mask moved by shift, restricted to pixels off the real grid."""
+    M = np.float32([[1, 0, shift[0]], [0, 1, shift[1]]])
+    h, w = thick_mask.shape
+    moved = cv2.warpAffine(thick_mask, M, (w, h), flags=cv2.INTER_NEAREST)
+    moved[thick_mask > 0] = 0
+    return moved
+
+
+def _peak_mb():
+    if resource is not None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / 1024.0 / (1024.0 if sys.platform == "darwin" else 1.0)
+    return tracemalloc.get_traced_memory()[1] / 2**20
+
+
+def _run(method, tile, img, mask, probe, radius, queue):
+    """Child process: times one backend on the real mask and on the probe."""
+    label = method if not tile else f"{method}@{tile}"
+    try:
+        if resource is None:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        inpaint(img, mask, method, radius, tile=tile, workers=THREADS)
+        wall = time.perf_counter() - t0
+        peak = _peak_mb()
+
+        # Probe: hide real grid + probe, score only the probe pixels
+        hidden = cv2.bitwise_or(mask, probe)
+        out = inpaint(img, hidden, method, radius, tile=tile, workers=THREADS)
+        sel = probe > 0
+        err = out[sel].astype(np.float64) - img[sel]
+        mse = float(np.mean(err ** 2))
+        psnr = 10 * np.log10(255.0 ** 2 / mse) if mse > 0 else float("inf")
+        queue.put((label, wall, peak, psnr, float(np.mean(np.abs(err))), ""))
+    except Exception as e:
+        queue.put((label, None, None, None, None, f"{type(e).__name__}: {e}"))
+
+
+def main():
+    img = cv2.imread(IMAGE_PATH)
+    if img is None:
+        raise FileNotFoundError(f"Cannot load '{IMAGE_PATH}'")
+    grid = load_mask(GRID_PATH)
+    if grid.shape != img.shape[:2]:
+        grid = cv2.resize(grid, img.shape[1::-1], interpolation=cv2.INTER_NEAREST)
+    mask = dilated_mask(grid, THICKEN_PIXELS)
+    probe = probe_mask(mask, PROBE_SHIFT)
+
+    print(f"{os.path.basename(IMAGE_PATH)}: {img.shape[1]}×{img.shape[0]}, "
+          f"mask {int(np.count_nonzero(mask))} px, probe {int(np.count_nonzero(probe))} px\n")
+    header = f"{'method':<20}{'wall s':>9}{'peak MB':>10}{'PSNR dB':>10}{'MAE':>8}"
+    print(header)
+    print("─" * len(header))
+
+    rows = []
+    ctx = mp.get_context("spawn")  # fresh process → clean RSS baseline
+    for method in METHODS:
+        for tile in TILES:
+            queue = ctx.Queue()
+            p = ctx.Process(target=_run,
+                            args=(method, tile, img, mask, probe, INPAINT_RADIUS, queue))
+            p.start()
+            row = queue.get()
+            p.join()
+            rows.append(row)
+            name, wall, peak, psnr, mae, note = row
+            if wall is None:
+                print(f"{name:<20}{'—':>9}{'—':>10}{'—':>10}{'—':>8}  {note}")
+            else:
+                print(f"{name:<20}{wall:>9.2f}{peak:>10.1f}{psnr:>10.2f}{mae:>8.2f}")
+
+    if CSV_PATH:
+        with open(CSV_PATH, "w", encoding="utf-8") as f:
+            f.write("method,wall_s,peak_mb,psnr_db,mae,note\n")
+            for name, wall, peak, psnr, mae, note in rows:
+                vals = ["" if v is None else f"{v:.4f}" for v in (wall, peak, psnr, mae)]
+                f.write(",".join([name, *vals, note.replace(",", ";")]) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@ import os
 import cv2
 import glob
 import numpy as np
-from skimage.restoration import inpaint_biharmonic
-from pyinpaint import Inpaint
+from grid_align import (get_matcher, compose_affine, unalign_matrix,
+                        translate_matrix, warp_frame)
+from inpaint_backends import inpaint
+from mask_store import load_mask, dilated_mask
 
 
 # ───────────────────────────────────────────────────────────────────────────────
@@ -17,7 +19,11 @@ BRIGHT_THRESH   = 180                         # Threshold to isolate grid pixels
 MAX_ANGLE       = 4                           # ± degrees to search for rotation
 ANGLE_STEP      = 0.1                         # Step size in degrees
 MAX_SHIFT       = 200                         # ± pixels to allow for translation
+ALIGN_MODE      = "fourier_mellin"            # "sweep", or grid_align.py "fft" / "fourier_mellin" / "pyramid"
 INPAINT_RADIUS  = 7                           # Radius for Telea/NS inpainting
+INPAINT_METHODS = ("telea", "ns", "biharmonic", "shiftmap")  # inpaint_backends.py names; one output each
+INPAINT_TILE    = 256                         # inpaint only mask‐bearing tiles (None = whole frame)
+INPAINT_THREADS = 4                           # threads for those tiles
 RECENTER_DISK   = False                       # Whether to recenter Earth disk
 SAVE_DEBUG      = True                       # Whether to save intermediate debug images
 SAVE_FULL_DEBUG = False                       # Save every θ‐rotated mask image
@@ -31,22 +37,6 @@ if SAVE_DEBUG:
 # ───────────────────────────────────────────────────────────────────────────────
 
 
-def load_grid_mask(path):
-    """
-    Loads grid.png (RGBA). Wherever alpha > 0, mask = 255; else 0.
-    """
-    rgba = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-    if rgba is None:
-        raise FileNotFoundError(f"Could not load '{path}'")
-    if rgba.shape[2] == 4:
-        alpha = rgba[:, :, 3]
-        mask = np.where(alpha > 0, 255, 0).astype(np.uint8)
-    else:
-        gray = cv2.cvtColor(rgba, cv2.COLOR_BGR2GRAY)
-        _, mask = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-    return mask
-
-
 def threshold_satellite(img_bgr, thresh, crop_top_frac=1/12):
     """
     Convert to grayscale and threshold > thresh → 255, else 0.
@@ -125,6 +115,9 @@ def match_grid_to_satellite(sat_thresh_full, grid_mask, frame_name):
         dbg_dir = os.path.join(DEBUG_FOLDER, frame_name)
         os.makedirs(dbg_dir, exist_ok=True)
         cv2.imwrite(os.path.join(dbg_dir, "sat_thresh_cropped.png"), sat_thresh_full)
+    if ALIGN_MODE != "sweep" and not SAVE_FULL_DEBUG:
+        y_off = int(grid_mask.shape[0] / 12)
+        return get_matcher(grid_mask, ALIGN_MODE, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT).match(sat_thresh_full, y_off)
 
     for theta in np.arange(-MAX_ANGLE, MAX_ANGLE + 1e-5, ANGLE_STEP):
         rot_mask = rotate_image(grid_mask, theta, interp=cv2.INTER_NEAREST)
@@ -151,56 +144,6 @@ def match_grid_to_satellite(sat_thresh_full, grid_mask, frame_name):
     return (*best_params, best_score)
 
 
-# ───────────────────────────────────────────────────────────────────────────────
-#                       Inpainting Methods (1–4)
-# ───────────────────────────────────────────────────────────────────────────────
-from pyinpaint import Inpaint
-
-def inpaint_telea(image_bgr, mask):
-    """OpenCV Telea inpainting."""
-    return cv2.inpaint(image_bgr, mask, INPAINT_RADIUS, flags=cv2.INPAINT_TELEA)
-
-def inpaint_ns(image_bgr, mask):
-    """OpenCV Navier–Stokes inpainting."""
-    return cv2.inpaint(image_bgr, mask, INPAINT_RADIUS, flags=cv2.INPAINT_NS)
-
-
-def inpaint_biharmonic_color(image_bgr, mask):
-    """
-    scikit-image biharmonic inpainting on each channel separately.
-    `mask` is a single-channel 0/255 uint8 array; we convert to boolean.
-    """
-    mask_bool = (mask > 0)
-    # Convert BGR→RGB float in [0,1]
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
-    out = np.zeros_like(image_rgb)
-    for c in range(3):
-        # NOTE: no `multichannel` argument
-        out[:, :, c] = inpaint_biharmonic(image_rgb[:, :, c], mask_bool)
-    # Convert back to BGR uint8
-    out_bgr = (np.clip(out * 255.0, 0, 255)).astype(np.uint8)
-    out_bgr = cv2.cvtColor(out_bgr, cv2.COLOR_RGB2BGR)
-    return out_bgr
-
-def inpaint_shiftmap(image_bgr, mask):
-    """
-    Exemplar‐based inpainting via OpenCV‐contrib’s xphoto ShiftMap.
-    Signature: cv2.xphoto.inpaint(src, mask, dst, flags)
-    Returns None if ShiftMap is unavailable or fails.
-    """
-    try:
-        dst = np.zeros_like(image_bgr)
-        result = cv2.xphoto.inpaint(image_bgr, mask, dst, cv2.xphoto.INPAINT_SHIFTMAP)
-        # If result is all zeros (i.e. empty), treat as failure:
-        if result is None or result.size == 0:
-            return None
-        return result
-    except Exception:
-        return None
-
-def inpaint_pyinpaint(image_bgr, mask):
-    inpainted_image = Inpaint(image_bgr, mask)
-    return inpainted_image()
 # ───────────────────────────────────────────────────────────────────────────────
 #                 Main alignment + inpainting pipeline
 # ───────────────────────────────────────────────────────────────────────────────
@@ -224,25 +167,26 @@ def align_and_inpaint(image_path, grid_mask):
     sat_thresh_full, y_off = threshold_satellite(sat_bgr, BRIGHT_THRESH, crop_top_frac=1/12)
     theta, dx, dy, score = match_grid_to_satellite(sat_thresh_full, grid_mask, frame_name)
 
-    trans = translate_image(sat_bgr, -dx, -dy, interp=cv2.INTER_LINEAR)
-    aligned = rotate_image(trans, -theta, interp=cv2.INTER_LINEAR)
+    # Translate, rotate and recenter composed into one affine → a single resample
+    M = unalign_matrix(theta, dx, dy, sat_bgr.shape)
 
     if RECENTER_DISK:
         rot_for_center = rotate_image(sat_bgr, -theta, interp=cv2.INTER_LINEAR)
         cx, cy = find_earth_center(rot_for_center)
         tx = (w / 2.0) - cx
         ty = (h / 2.0) - cy
-        aligned = translate_image(aligned, tx, ty, interp=cv2.INTER_LINEAR)
+        M = compose_affine(M, translate_matrix(tx, ty))
+
+    aligned = warp_frame(sat_bgr, M, interp=cv2.INTER_LINEAR)
 
     # Dilate grid_mask to produce a “thick” mask for inpainting
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (THICKEN_PIXELS, THICKEN_PIXELS))
-    thick_mask = cv2.dilate(grid_mask, kernel, iterations=1)
+    thick_mask = dilated_mask(grid_mask, THICKEN_PIXELS)
 
     return aligned, thick_mask, (theta, dx, dy, score)
 
 
 def main():
-    grid_mask = load_grid_mask(GRID_PATH)
+    grid_mask = load_mask(GRID_PATH)
     mh, mw = grid_mask.shape
 
     sat_paths = sorted(glob.glob(os.path.join(INPUT_FOLDER, "*.png")))
@@ -269,25 +213,15 @@ def main():
         # 1) Save aligned with grid (just the aligned BGR)
         cv2.imwrite(os.path.join(img_out_folder, "aligned_with_grid.png"), aligned_bgr)
 
-        # 2) Telea inpainting
-        telea = inpaint_telea(aligned_bgr, mask_for_inpaint)
-        cv2.imwrite(os.path.join(img_out_folder, "inpaint_telea.png"), telea)
-
-        # 3) Navier–Stokes inpainting
-        ns = inpaint_ns(aligned_bgr, mask_for_inpaint)
-        cv2.imwrite(os.path.join(img_out_folder, "inpaint_ns.png"), ns)
-
-        # 4) Biharmonic inpainting (scikit‐image)
-        biharm = inpaint_biharmonic_color(aligned_bgr, mask_for_inpaint)
-        cv2.imwrite(os.path.join(img_out_folder, "inpaint_biharmonic.png"), biharm)
-
-        # 5) ShiftMap inpainting (opencv‐contrib)
-        # 5) ShiftMap inpainting (opencv‐contrib)
-        shiftmap = inpaint_shiftmap(aligned_bgr, mask_for_inpaint)
-        if shiftmap is not None:
-            cv2.imwrite(os.path.join(img_out_folder, "inpaint_shiftmap.png"), shiftmap)
-        else:
-            print("  – ShiftMap inpainting unavailable or failed for", frame_name)
+        # 2) One output per inpainting backend (inpaint_backends.py)
+        for method in INPAINT_METHODS:
+            try:
+                healed = inpaint(aligned_bgr, mask_for_inpaint, method, INPAINT_RADIUS,
+                                 tile=INPAINT_TILE, workers=INPAINT_THREADS)
+            except Exception as e:
+                print(f"  – {method} inpainting unavailable or failed for {frame_name}: {e}")
+                continue
+            cv2.imwrite(os.path.join(img_out_folder, f"inpaint_{method}.png"), healed)
 
         # (Optional) Save debug images
         if SAVE_DEBUG:
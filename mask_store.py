@@ -0,0 +1,210 @@
+import hashlib
+import os
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Grid mask assets shared by the heal scripts and grid_align.py.  Each
+#   mask PNG is read once per process and everything derived from it is
+#   memoised: dilations per kernel size, rotations per θ, and the cropped
+#   FFT spectra of a whole θ sweep.  Returned arrays are shared and marked
+#   read‐only.
+#
+#   With set_cache_dir(path) the derived forms also go to disk, keyed by the
+#   mask's content hash, so later runs and other scripts (and every pool
+#   worker) load them instead of recomputing: binary masks as packbits in
+#   .npz, spectra as .npy opened memory‐mapped.
+#
+#   A whole θ sweep of a 2000² mask is ~0.18 GB of rotated masks plus ~0.7 GB
+#   of spectra, so sweeps and spectra are LRUs of MAX_SWEEPS entries each:
+#   a process aligning against many masks keeps only the latest few and
+#   rebuilds (or re‐maps from disk) the others when it comes back to them.
+# ───────────────────────────────────────────────────────────────────────────────
+
+CACHE_DIR = None          # on‐disk cache; None = memory only
+CACHE_SPECTRA = True      # also put sweep spectra on disk (~0.7 GB per 2000² mask / sweep)
+MAX_ROTATIONS = 512       # single‐θ rotations kept in memory per process (LRU)
+MAX_SWEEPS = 2            # θ sweeps, and sweep spectra, kept in memory per process (LRU)
+
+_MASKS = {}               # (abspath, mtime, size) → mask
+_DIGESTS = {}             # id(mask) → (mask, sha1)
+_DILATED = {}             # (sha1, k) → mask
+_ROTATED = OrderedDict()  # (sha1, θ) → mask
+_SWEEPS = OrderedDict()   # (sha1, thetas) → [masks]
+_SPECTRA = OrderedDict()  # (sha1, thetas, y_off, dft_shape) → complex64 array
+
+
+def set_cache_dir(path):
+    """Turns the on‐disk cache on (path) or off (None)."""
+    global CACHE_DIR
+    CACHE_DIR = path
+    if path:
+        os.makedirs(path, exist_ok=True)
+
+
+def _lru_put(cache, key, value, limit):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+def _frozen(arr):
+    arr.flags.writeable = False
+    return arr
+
+
+def read_mask(path):
+    """Grid mask PNG → 0/255 uint8: alpha > 0 if RGBA, else gray > 127."""
+    rgba = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if rgba is None:
+        raise FileNotFoundError(f"Could not load grid mask at '{path}'")
+    if rgba.ndim == 3 and rgba.shape[2] == 4:
+        alpha = rgba[:, :, 3]
+        return np.where(alpha > 0, 255, 0).astype(np.uint8)
+    gray = rgba if rgba.ndim == 2 else cv2.cvtColor(rgba, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    return mask
+
+
+def load_mask(path):
+    """read_mask, once per file version per process."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if key not in _MASKS:
+        _MASKS[key] = _frozen(read_mask(path))
+    return _MASKS[key]
+
+
+def mask_id(mask):
+    """sha1 of a mask's shape and pixels, computed once per array."""
+    hit = _DIGESTS.get(id(mask))
+    if hit is None or hit[0] is not mask:
+        h = hashlib.sha1(repr(mask.shape).encode())
+        h.update(np.ascontiguousarray(mask).tobytes())
+        hit = (mask, h.hexdigest())
+        _DIGESTS[id(mask)] = hit
+    return hit[1]
+
+
+# ─── disk cache ────────────────────────────────────────────────────────────────
+
+def _path(name):
+    return os.path.join(CACHE_DIR, name) if CACHE_DIR else None
+
+
+def _load_bits(name, shape):
+    path = _path(name)
+    if not path or not os.path.isfile(path):
+        return None
+    with np.load(path) as z:
+        bits = np.unpackbits(z["bits"], axis=-1, count=shape[-2] * shape[-1])
+    return bits.reshape(shape) * np.uint8(255)
+
+
+def _save_bits(name, masks):
+    """masks: one 0/255 array or a stack of them (first axis)."""
+    path = _path(name)
+    if not path:
+        return
+    flat = (np.asarray(masks) > 0).reshape(len(masks) if np.ndim(masks) == 3 else 1, -1)
+    tmp = path + f".{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, bits=np.packbits(flat, axis=-1))
+    os.replace(tmp, path)
+
+
+def _is_binary(mask):
+    return bool(np.all((mask == 0) | (mask == 255)))
+
+
+# ─── derived forms ─────────────────────────────────────────────────────────────
+
+def dilated_mask(mask, k):
+    """cv2.dilate(mask, MORPH_RECT k×k), once per mask and k."""
+    key = (mask_id(mask), k)
+    out = _DILATED.get(key)
+    if out is None:
+        name = f"{key[0]}_dil{k}.npz"
+        out = _load_bits(name, mask.shape)
+        if out is None:
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (k, k))
+            out = cv2.dilate(mask, kernel, iterations=1)
+            if _is_binary(mask):
+                _save_bits(name, out)
+        _DILATED[key] = out = _frozen(out)
+    return out
+
+
+def _rotate(mask, theta):
+    h, w = mask.shape[:2]
+    M = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), theta, 1.0)
+    return cv2.warpAffine(mask, M, (w, h), flags=cv2.INTER_NEAREST)
+
+
+def rotated_mask(mask, theta):
+    """
+    rotate_image(mask, θ, INTER_NEAREST), memoised per (mask, θ) in an LRU
+    of MAX_ROTATIONS; θ from a full sweep (rotated_sweep) is a hit too.
+    """
+    key = (mask_id(mask), round(float(theta), 9))
+    out = _ROTATED.get(key)
+    if out is None:
+        out = _frozen(_rotate(mask, theta))
+    _lru_put(_ROTATED, key, out, MAX_ROTATIONS)
+    return out
+
+
+def _sweep_key(thetas):
+    return tuple(round(float(t), 9) for t in thetas)
+
+
+def _sweep_name(digest, thetas):
+    h = hashlib.sha1(repr(_sweep_key(thetas)).encode()).hexdigest()[:12]
+    return f"{digest}_rot{h}"
+
+
+def rotated_sweep(mask, thetas):
+    """[rotated_mask(mask, θ) for θ in thetas], cached on disk as one file."""
+    digest = mask_id(mask)
+    key = (digest, _sweep_key(thetas))
+    rots = _SWEEPS.get(key)
+    if rots is None:
+        name = _sweep_name(digest, thetas) + ".npz"
+        stack = _load_bits(name, (len(thetas),) + mask.shape)
+        if stack is None:
+            stack = np.stack([_rotate(mask, t) for t in thetas])
+            if _is_binary(mask):
+                _save_bits(name, stack)
+        rots = [_frozen(r) for r in stack]
+        for t, r in zip(key[1], rots):
+            _lru_put(_ROTATED, (digest, t), r, MAX_ROTATIONS)
+    _lru_put(_SWEEPS, key, rots, MAX_SWEEPS)
+    return rots
+
+
+def sweep_spectra(mask, thetas, y_off, dft_shape):
+    """
+    rfft2 of every rotated_sweep mask cropped at y_off, padded to dft_shape,
+    as one complex64 (len(thetas), M, N//2 + 1) array.  On disk (when
+    CACHE_SPECTRA) it is a .npy reopened memory‐mapped, so a later run only
+    pages in what it reads.
+    """
+    digest = mask_id(mask)
+    key = (digest, _sweep_key(thetas), y_off, tuple(dft_shape))
+    specs = _SPECTRA.get(key)
+    if specs is None:
+        M, N = dft_shape
+        path = _path(f"{_sweep_name(digest, thetas)}_y{y_off}_{M}x{N}.npy") if CACHE_SPECTRA else None
+        if path and os.path.isfile(path):
+            specs = np.load(path, mmap_mode="r")
+        else:
+            specs = np.empty((len(thetas), M, N // 2 + 1), dtype=np.complex64)
+            for i, rot in enumerate(rotated_sweep(mask, thetas)):
+                specs[i] = np.fft.rfft2(rot[y_off:, :].astype(np.float32), s=(M, N))
+            if path:
+                tmp = path + f".{os.getpid()}.tmp.npy"
+                np.save(tmp, specs)
+                os.replace(tmp, path)
+    _lru_put(_SPECTRA, key, specs, MAX_SWEEPS)
+    return specs
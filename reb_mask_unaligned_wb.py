@@ -3,6 +3,7 @@ import cv2
 import numpy as np
 import glob
 import re
+from grid_align import get_scorer
 
 # ───────────────────────────────────────────────────────────────────────────────
 #                        USER–CONFIGURATION
@@ -29,6 +30,7 @@ SHIFT_CLAMP = 200  # max translation clamp
 VERT_OFFSET = 50  # pixels above median mask line to sample
 HORIZ_START_OFS = 50  # pixels to shift start right
 HORIZ_END_OFS = 30  # pixels to shift end left
+SPARSE_SCORING = False  # score candidates from the mask pixel list (grid_align.SparseGridScorer); shifts still use full-frame phase correlation
 
 # Load and binarize bar mask
 rgba = cv2.imread(MASK_PATH, cv2.IMREAD_UNCHANGED)
@@ -68,9 +70,12 @@ def find_bar_transform(img_bin, mask):
             crop = mask_rot[:roi_h, :].astype(np.float32)
             (dx, dy), _ = cv2.phaseCorrelate(crop, img_roi)
             dx, dy = clamp(dx, dy)
-            Mtrans = np.float32([[1, 0, dx], [0, 1, dy]])
-            aligned = cv2.warpAffine(mask_rot, Mtrans, (w, h), flags=cv2.INTER_NEAREST)
-            overlap = cv2.countNonZero(cv2.bitwise_and(aligned[:roi_h, :], img_bin[:roi_h, :]))
+            if SPARSE_SCORING:
+                overlap = get_scorer(mask).score(img_bin[:roi_h, :], ang, dx, dy)
+            else:
+                Mtrans = np.float32([[1, 0, dx], [0, 1, dy]])
+                aligned = cv2.warpAffine(mask_rot, Mtrans, (w, h), flags=cv2.INTER_NEAREST)
+                overlap = cv2.countNonZero(cv2.bitwise_and(aligned[:roi_h, :], img_bin[:roi_h, :]))
             if overlap > best['score']:
                 best.update({'score': overlap, 'angle': ang, 'dx': dx, 'dy': dy})
 
@@ -3,8 +3,9 @@ import numpy as np
 import cv2 as cv
 import os
 from datetime import date, timedelta
-from rembg import remove, new_session
-from PIL import Image
+from rembg import new_session
+import rembg_matte
+from green_fill import fill_green_once
 
 def parse_ddd_to_date(year, doy):
     d = date(year, 1, 1) + timedelta(days=doy - 1)
@@ -24,24 +25,6 @@ def find_ON(data):
             return ln["boundingPolygon"][0]
     return None
 
-def fill_green_once(shifted, green_mask):
-    h, w = green_mask.shape
-    out = shifted.copy()
-    changed = False
-    neigh = [(-1, 0), (1, 0), (0, -1), (0, 1),
-             (-1, -1), (-1, 1), (1, -1), (1, 1)]
-    ys, xs = np.where(green_mask)
-    for y, x in zip(ys, xs):
-        vals = []
-        for dy, dx in neigh:
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w and not green_mask[ny, nx]:
-                vals.append(shifted[ny, nx])
-        if vals:
-            out[y, x] = np.mean(vals, axis=0).astype(np.uint8)
-            changed = True
-    return out, changed
-
 def grayworld_whitebalance(img_bgr: np.ndarray) -> np.ndarray:
     img = img_bgr.astype(np.float32)
     b_mean, g_mean, r_mean = cv.mean(img)[:3]
@@ -88,6 +71,8 @@ kernel = cv.getStructuringElement(cv.MORPH_ELLIPSE, (brush_size, brush_size))
 GREEN = np.array((0, 255, 0), np.uint8)
 
 rembg_sess = new_session("unet")
+MATTE_CACHE_DIR = None  # e.g. a scratch dir outside the input tree: reuse mattes of identical frames across runs
+rembg_matte.set_matte_cache(MATTE_CACHE_DIR)
 
 # ───────── build our “year & DOY spans” ─────────
 spans = [
@@ -137,9 +122,7 @@ for (year, doy_start, doy_end) in spans:
             if img is None:
                 continue
 
-            pil = Image.fromarray(cv.cvtColor(img, cv.COLOR_BGR2RGB))
-            rembg_pil = remove(pil, session=rembg_sess).convert("RGBA")
-            rgba_arr   = np.array(rembg_pil)  # shape = (2000, 2000, 4)
+            rgba_arr = rembg_matte.remove_background(img, rembg_sess)  # shape = (2000, 2000, 4)
 
             # ── affine shift on RGBA (keeps transparency)
             T = np.float32([[1, 0, xshift], [0, 1, yshift]])
@@ -0,0 +1,101 @@
+import glob
+import time
+import cv2
+import numpy as np
+from rembg import new_session
+from rembg_matte import disk_alpha
+import disk_segment
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Times rembg_matte.disk_alpha at each SCALES entry (with and without
+#   refine) on IMAGE_GLOB's frames and compares every matte with the
+#   full‐size one:
+#     • alpha MAE  — mean |Δalpha| over the frame
+#     • IoU        — of the alpha > 127 disks
+#     • edge px    — mean / max distance from each edge pixel of the disk
+#                    to the full‐size disk's edge (both ways)
+#   plus a "geom" row for disk_segment's limb‐ellipse matte (frames
+#   whose fit is rejected are counted, not scored).
+# ───────────────────────────────────────────────────────────────────────────────
+
+IMAGE_GLOB = "images/*.vi.med.png"    # a few aligned or raw preview frames
+MAX_IMAGES = 5
+MODEL      = "unet"
+SCALES     = (1.0, 0.5, 0.35, 0.25, 0.16)
+REFINE     = (False, True)
+REPEATS    = 2                        # best of, per frame
+
+
+def edge(mask):
+    """Boundary pixels of a boolean mask (mask minus its erosion)."""
+    m = mask.astype(np.uint8)
+    return (m - cv2.erode(m, np.ones((3, 3), np.uint8))) > 0
+
+
+def edge_distance(a, b):
+    """Distances from every edge pixel of a to the nearest edge pixel of b, and back."""
+    ea, eb = edge(a), edge(b)
+    if not ea.any() or not eb.any():
+        return np.array([np.inf])
+    da = cv2.distanceTransform((~eb).astype(np.uint8), cv2.DIST_L2, 5)
+    db = cv2.distanceTransform((~ea).astype(np.uint8), cv2.DIST_L2, 5)
+    return np.concatenate([da[ea], db[eb]])
+
+
+def timed(fn, *args):
+    best, out = float("inf"), None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def score(dt, alpha, ref):
+    disk, ref_disk = alpha > 127, ref > 127
+    union = np.count_nonzero(disk | ref_disk)
+    iou = np.count_nonzero(disk & ref_disk) / union if union else 1.0
+    d = edge_distance(disk, ref_disk)
+    mae = float(np.mean(np.abs(alpha.astype(np.int16) - ref)))
+    return dt, mae, iou, float(d.mean()), float(d.max())
+
+
+def main():
+    paths = sorted(glob.glob(IMAGE_GLOB))[:MAX_IMAGES]
+    if not paths:
+        raise FileNotFoundError(f"No frames match '{IMAGE_GLOB}'")
+    session = new_session(MODEL)
+    rows = {}
+    rejected = 0
+    for p in paths:
+        img = cv2.imread(p)
+        if img is None:
+            continue
+        disk_alpha(img, session)  # warm‐up: first run pays for ONNX setup
+        ref = None
+        for scale in SCALES:
+            for refine in REFINE:
+                dt, alpha = timed(disk_alpha, img, session, scale, refine)
+                if ref is None:
+                    ref = alpha
+                rows.setdefault((scale, refine), []).append(score(dt, alpha, ref))
+        dt, alpha = timed(disk_segment.disk_alpha, img)
+        if alpha is None:
+            rejected += 1
+        else:
+            rows.setdefault(("geom", False), []).append(score(dt, alpha, ref))
+
+    print(f"{len(paths)} frame(s), model {MODEL}; errors against scale 1.0, no refine\n")
+    header = f"{'scale':>6}{'refine':>8}{'time s':>9}{'alpha MAE':>11}{'IoU':>8}{'edge px':>9}{'max px':>8}"
+    print(header)
+    print("─" * len(header))
+    for (scale, refine), vals in rows.items():
+        dt, mae, iou, dmean, dmax = np.mean(vals, axis=0)
+        label = scale if isinstance(scale, str) else f"{scale:.2f}"
+        print(f"{label:>6}{str(refine):>8}{dt:>9.3f}{mae:>11.2f}{iou:>8.4f}{dmean:>9.2f}{dmax:>8.1f}")
+    if rejected:
+        print(f"geometric fit rejected on {rejected} frame(s) (rembg fallback)")
+
+
+if __name__ == "__main__":
+    main()
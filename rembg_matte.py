@@ -0,0 +1,177 @@
+import hashlib
+import os
+import cv2
+import numpy as np
+from PIL import Image
+from inpaint_backends import apply_matte
+import disk_segment
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   rembg background removal for the heal scripts, optionally on a
+#   downscaled copy.  The matte is only used to find the Earth disk, and the
+#   u2net‐family models run at 320×320 whatever they're given, so at full size
+#   most of the time goes to resampling the 2000×2000 frame down to the model
+#   and the mask back up (LANCZOS, in PIL).  With scale < 1 the frame is
+#   shrunk with INTER_AREA first and the alpha matte scaled back with
+#   INTER_LINEAR.
+#
+#   refine=True re‐decides the soft edge band at full resolution from the
+#   frame itself: pixels of the band brighter than REFINE_THRESH are disk,
+#   the rest space (the same "darker than 10 is outside the globe" rule as
+#   grid_maker.find_globe_center).  Night‐side limb can be darker than that,
+#   so it's off by default.
+#
+#   remove_background returns what the scripts' own version did: the PIL
+#   RGBA cutout as an array (RGB order, colour × alpha).  At scale 1 it is
+#   the same image, since rembg's default cutout is that same composite.
+#
+#   With set_matte_cache(dir) the model's matte is also kept on disk as a
+#   PNG named by the sha1 of the input pixels, the model and the scale, so
+#   re‐runs and parameter sweeps over the same frames skip rembg entirely.
+#   The directory is held under max_mb by dropping the least recently used
+#   mattes (a hit touches the file's mtime).
+#
+#   method="geometric" tries disk_segment's limb‐ellipse fit first (a few tens
+#   of ms, no model) and only runs rembg on frames whose fit it rejects.  The
+#   ellipse matte is exact at full size already, so scale / refine / the
+#   cache only apply to the rembg fallback.
+# ───────────────────────────────────────────────────────────────────────────────
+
+REFINE_THRESH = 10       # gray level separating disk from space in the edge band
+REFINE_BAND = 3          # px the soft band is grown by before re‐deciding it
+MATTE_CACHE_MB = 2048    # default size bound of the matte cache
+METHODS = ("rembg", "geometric")
+
+_CACHE = None
+
+
+class MatteCache:
+    """Directory of alpha PNGs keyed by content hash, LRU‐bounded in size."""
+
+    def __init__(self, path, max_mb=MATTE_CACHE_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 2**20)
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(e.stat().st_size for e in os.scandir(path)
+                        if e.is_file() and e.name.endswith(".png"))
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(img_bgr, model, scale):
+        h = hashlib.sha1(repr((img_bgr.shape, str(img_bgr.dtype), model, float(scale))).encode())
+        h.update(np.ascontiguousarray(img_bgr).data)
+        return h.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".png")
+
+    def get(self, key):
+        path = self._file(key)
+        alpha = cv2.imread(path, cv2.IMREAD_UNCHANGED) if os.path.isfile(path) else None
+        if alpha is None:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return alpha
+
+    def put(self, key, alpha):
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.tmp.png"
+        cv2.imwrite(tmp, alpha, [cv2.IMWRITE_PNG_COMPRESSION, 6])
+        try:
+            old = os.path.getsize(path)  # overwriting a key: don't count it twice
+        except OSError:
+            old = 0
+        os.replace(tmp, path)
+        self.size += os.path.getsize(path) - old
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used mattes until under 90 % of the bound."""
+        files = [e for e in os.scandir(self.path) if e.is_file() and e.name.endswith(".png")]
+        files.sort(key=lambda e: e.stat().st_mtime)
+        self.size = sum(e.stat().st_size for e in files)
+        for e in files:
+            if self.size <= 0.9 * self.max_bytes:
+                break
+            try:
+                size = e.stat().st_size
+                os.remove(e.path)
+                self.size -= size
+            except OSError:
+                pass  # another process got there first
+
+
+def set_matte_cache(path, max_mb=MATTE_CACHE_MB):
+    """Turns the on‐disk matte cache on (path) or off (None)."""
+    global _CACHE
+    _CACHE = MatteCache(path, max_mb) if path else None
+    return _CACHE
+
+
+def _model_name(session):
+    return getattr(session, "model_name", None) or type(session).__name__
+
+
+def model_alpha(img_bgr, session):
+    """rembg's alpha matte for img_bgr (uint8, img_bgr's size)."""
+    if hasattr(session, "matte"):
+        return session.matte(img_bgr)  # rembg_service.RemoteSession
+    from rembg import remove
+    pil = Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
+    return np.array(remove(pil, session=session, only_mask=True).convert("L"))
+
+
+def refine_edge(alpha, img_bgr, thresh=REFINE_THRESH, band=REFINE_BAND):
+    """alpha with its soft (0 < a < 255) band, grown by band px, thresholded on img_bgr."""
+    soft = ((alpha > 0) & (alpha < 255)).astype(np.uint8)
+    if band:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * band + 1, 2 * band + 1))
+        soft = cv2.dilate(soft, kernel)
+    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    out = alpha.copy()
+    sel = soft > 0
+    out[sel] = np.where(gray[sel] > thresh, 255, 0)
+    return out
+
+
+def disk_alpha(img_bgr, session, scale=1.0, refine=False, method="rembg"):
+    """
+    Alpha matte of img_bgr at full size, from the model run on a copy
+    scaled by `scale` (1.0 = as given), or from the limb fit if method is
+    "geometric" and the fit holds.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown matte method {method!r}, expected one of {METHODS}")
+    if method == "geometric":
+        alpha = disk_segment.disk_alpha(img_bgr)
+        if alpha is not None:
+            return alpha
+    h, w = img_bgr.shape[:2]
+    scale = min(scale, 1.0)
+    key = MatteCache.key(img_bgr, _model_name(session), scale) if _CACHE else None
+    alpha = _CACHE.get(key) if key else None
+    if alpha is None:
+        if scale == 1.0:
+            alpha = model_alpha(img_bgr, session)
+        else:
+            small = cv2.resize(img_bgr, (max(int(round(w * scale)), 1), max(int(round(h * scale)), 1)),
+                               interpolation=cv2.INTER_AREA)
+            alpha = cv2.resize(model_alpha(small, session), (w, h), interpolation=cv2.INTER_LINEAR)
+        if key:
+            _CACHE.put(key, alpha)
+    if refine:
+        alpha = refine_edge(alpha, img_bgr)
+    return alpha
+
+
+def remove_background(img_bgr, session, scale=1.0, refine=False, method="rembg"):
+    """RGBA cutout array (RGB order, colour × alpha), like rembg's remove()."""
+    alpha = disk_alpha(img_bgr, session, scale, refine, method)
+    rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    return np.dstack([apply_matte(rgb, alpha), alpha])
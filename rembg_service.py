@@ -0,0 +1,263 @@
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+import cv2
+import numpy as np
+from PIL import Image
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Shared rembg model for several scripts / pool workers at once.  Run this
+#   file as its own process: it loads MODEL once and serves mattes on a Unix
+#   socket (ADDRESS), so N heal runners hold one ONNX session instead of N.
+#
+#   Each client connection is served by a thread that hands frames to one
+#   inference thread; that thread takes whatever is queued, up to BATCH_SIZE
+#   frames, waiting at most BATCH_WAIT s for a batch to fill, and runs them
+#   through the model together.  Batches are real (one ONNX call, N×3×H×W)
+#   when the session rembg resolved the model to is one of the u2net‐family
+#   classes in BATCH_INPUTS (by the class's name(), so "unet", which rembg
+#   serves with a U2netSession, batches too) and the model's batch axis is
+#   dynamic; other models, or a model exported with batch 1, run the queued
+#   frames one after another (still one shared session).
+#
+#   Client side: session(model, address) gives a RemoteSession if address is
+#   set, else a local new_session(model).  rembg_matte's disk_alpha /
+#   remove_background take either, so the scripts only swap the session.
+#   A RemoteSession connects lazily and again after a fork.  matte() sends
+#   one frame and waits for it, so one‐at‐a‐time callers only batch with
+#   other clients; mattes(frames) sends them all before reading any reply,
+#   so a single client can fill a batch by itself.
+# ───────────────────────────────────────────────────────────────────────────────
+
+ADDRESS = "/tmp/rembg_unet.sock"
+AUTHKEY = b"satellite_digitize"
+MODEL = "unet"
+BATCH_SIZE = 4           # frames per ONNX call at most
+BATCH_WAIT = 0.02        # s the first frame of a batch waits for company
+
+# u2net‐family preprocessing by session class name(): mean, std, input size
+BATCH_INPUTS = {
+    "u2net":           ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2netp":          ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2net_human_seg": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "silueta":         ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+}
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+#                                   C L I E N T
+# ───────────────────────────────────────────────────────────────────────────────
+
+class RemoteSession:
+    """Stand‐in for a rembg session whose model lives in the service."""
+
+    def __init__(self, address=ADDRESS, authkey=AUTHKEY):
+        self.address = address
+        self.authkey = authkey
+        self._model = None
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            # a forked child must not talk over its parent's socket
+            self._conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._pid = os.getpid()
+            self._model = self._call("model")
+        return self._conn
+
+    @property
+    def model_name(self):
+        """The service's model (rembg_matte keys its matte cache on it)."""
+        self._connection()
+        return self._model
+
+    def _call(self, *request):
+        self._conn.send(request)
+        status, value = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"rembg service: {value}")
+        return value
+
+    def matte(self, img_bgr):
+        """The model's alpha matte for img_bgr (uint8, img_bgr's size)."""
+        self._connection()
+        return self._call("matte", np.ascontiguousarray(img_bgr))
+
+    def mattes(self, imgs_bgr):
+        """Mattes for several frames, all in flight at once so they can share a batch."""
+        self._connection()
+        for img in imgs_bgr:
+            self._conn.send(("matte", np.ascontiguousarray(img)))
+        out, error = [], None
+        for _ in imgs_bgr:
+            status, value = self._conn.recv()   # read every reply, even after an error
+            if status != "ok" and error is None:
+                error = value
+            out.append(value)
+        if error is not None:
+            raise RuntimeError(f"rembg service: {error}")
+        return out
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+def session(model=MODEL, address=None):
+    """RemoteSession on address if given, else a local rembg session for model."""
+    if address:
+        return RemoteSession(address)
+    from rembg import new_session
+    return new_session(model)
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+#                                   S E R V E R
+# ───────────────────────────────────────────────────────────────────────────────
+
+def _batch_input(sess):
+    """(mean, std, size) if sess can take a stacked batch, else None."""
+    name = getattr(type(sess), "name", None)
+    kind = name() if callable(name) else None
+    if kind not in BATCH_INPUTS or not hasattr(sess, "inner_session"):
+        return None
+    batch_dim = sess.inner_session.get_inputs()[0].shape[0]
+    return BATCH_INPUTS[kind] if not isinstance(batch_dim, int) else None
+
+
+def predict_batch(sess, imgs_bgr, batch_input=None):
+    """Alpha mattes for imgs_bgr, in one ONNX call if batch_input is set."""
+    from rembg_matte import model_alpha
+    if batch_input is None or len(imgs_bgr) == 1:
+        return [model_alpha(img, sess) for img in imgs_bgr]
+    mean, std, size = batch_input
+    pils = [Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)) for img in imgs_bgr]
+    feeds = [sess.normalize(p, mean, std, size) for p in pils]
+    name = next(iter(feeds[0]))
+    preds = sess.inner_session.run(None, {name: np.concatenate([f[name] for f in feeds])})[0][:, 0]
+    out = []
+    for pred, pil in zip(preds, pils):
+        # same min‐max stretch and LANCZOS upsampling as U2netSession.predict
+        lo, hi = pred.min(), pred.max()
+        pred = (pred - lo) / max(hi - lo, 1e-12)
+        mask = Image.fromarray((pred.clip(0, 1) * 255).astype("uint8"), mode="L")
+        out.append(np.array(mask.resize(pil.size, Image.Resampling.LANCZOS)))
+    return out
+
+
+class MatteServer:
+    """One rembg session, fed by any number of client connections."""
+
+    def __init__(self, model=MODEL, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT):
+        from rembg import new_session
+        self.model = model
+        self.sess = new_session(model)
+        self.batch_input = _batch_input(self.sess)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.jobs = queue.Queue()
+        self.frames = self.batches = 0
+
+    def _next_batch(self):
+        batch = [self.jobs.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            left = deadline - time.monotonic()
+            try:
+                batch.append(self.jobs.get(timeout=left) if left > 0 else self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def infer_loop(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                mattes = predict_batch(self.sess, [img for img, _ in batch], self.batch_input)
+                replies = [("ok", m) for m in mattes]
+            except Exception as e:
+                if self.batch_input is not None and len(batch) > 1:
+                    # the model refused the stacked input: batch 1 from now on
+                    print(f"Batched inference failed ({e}); running frames one by one")
+                    self.batch_input = None
+                    for job in batch:
+                        self.jobs.put(job)
+                    continue
+                replies = [("error", repr(e))] * len(batch)
+            for (_, reply), r in zip(batch, replies):
+                reply.put(r)
+            self.frames += len(batch)
+            self.batches += 1
+
+    def serve_client(self, conn):
+        # replies go out in request order: jobs are queued and batched FIFO,
+        # so a client may have any number of frames in flight
+        replies = queue.Queue()
+        sender = threading.Thread(target=self._send_replies, args=(conn, replies), daemon=True)
+        sender.start()
+        try:
+            while True:
+                request = conn.recv()
+                if request[0] == "model":
+                    done = queue.Queue(maxsize=1)
+                    done.put(("ok", self.model))
+                    replies.put(done)
+                elif request[0] == "matte":
+                    done = queue.Queue(maxsize=1)
+                    self.jobs.put((request[1], done))
+                    replies.put(done)
+                else:
+                    done = queue.Queue(maxsize=1)
+                    done.put(("error", f"unknown request {request[0]!r}"))
+                    replies.put(done)
+        except (EOFError, ConnectionResetError):
+            pass
+        finally:
+            replies.put(None)
+            sender.join()
+            conn.close()
+
+    @staticmethod
+    def _send_replies(conn, replies):
+        while True:
+            done = replies.get()
+            if done is None:
+                return
+            reply = done.get()
+            try:
+                conn.send(reply)
+            except OSError:
+                pass  # client went away; keep draining so the reader can finish
+
+    def serve(self, address=ADDRESS, authkey=AUTHKEY):
+        if os.path.exists(address):
+            os.remove(address)  # stale socket from a previous run
+        threading.Thread(target=self.infer_loop, daemon=True).start()
+        with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+            print(f"rembg service: model {self.model} on {address} "
+                  f"(batch {self.batch_size if self.batch_input else 1})")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self.serve_client, args=(conn,), daemon=True).start()
+
+
+def main():
+    try:
+        MatteServer(MODEL).serve(ADDRESS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(ADDRESS):
+            os.remove(ADDRESS)
+
+
+if __name__ == "__main__":
+    main()
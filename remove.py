@@ -1,6 +1,7 @@
 from rembg import remove
 from PIL import Image, ImageDraw
 import numpy as np
+from disk_center import widest_run
 
 # load and remove background
 input_path  = "images/32A.1976.284.204500.vi.med.png"
@@ -11,35 +12,8 @@ rgba        = remove(input_image).convert("RGBA")
 # extract alpha channel as a 2D array
 alpha = np.array(rgba)[:, :, 3]
 
-# compute width at each row
-widths = (alpha > 0).sum(axis=1)
-y_max  = int(np.argmax(widths))
-
-# get all x positions in that row that are opaque
-xs = np.where(alpha[y_max] > 0)[0]
-
-# find runs of consecutive xs
-runs = []
-start = xs[0]
-prev  = xs[0]
-for x in xs[1:]:
-    if x == prev + 1:
-        prev = x
-    else:
-        runs.append((start, prev))
-        start = prev = x
-runs.append((start, prev))
-
-# pick the first run whose length >= 10
-x_start = x_end = None
-for a, b in runs:
-    if (b - a + 1) >= 10:
-        x_start, x_end = a, b
-        break
-
-if x_start is None:
-    # fallback: just use the full span
-    x_start, x_end = int(xs.min()), int(xs.max())
+# widest row, and on it the first run of ≥ 10 opaque pixels (or the full span)
+y_max, x_start, x_end = widest_run(alpha, min_run=10)
 
 # center of that segment
 x_center = (x_start + x_end) // 2
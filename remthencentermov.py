@@ -3,8 +3,10 @@ import numpy as np
 import cv2 as cv
 import os
 from datetime import date, timedelta
-from rembg import remove, new_session
-from PIL import Image
+from rembg import new_session
+import rembg_matte
+import disk_center
+from green_fill import fill_green_once
 
 
 def parse_ddd_to_date(year, doy):
@@ -16,34 +18,6 @@ def parse_ddd_to_date(year, doy):
 
 
 
-# a function that, given the image and green‐mask, does one pass:
-def fill_green_once(shifted, green_mask):
-    h, w = green_mask.shape
-    # prepare a new image to write into
-    out = shifted.copy()
-    changed = False
-
-    # offsets for 8-neighbours
-    neigh = [(-1, 0), (+1, 0), (0, -1), (0, +1), (-1, -1), (-1, +1), (1, -1), (1, 1)]
-
-    # get coords of all green pixels
-    ys, xs = np.where(green_mask)
-    for (y, x) in zip(ys, xs):
-        vals = []
-        for dy, dx in neigh:
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w:
-                if not green_mask[ny, nx]:
-                    vals.append(shifted[ny, nx])
-        if vals:
-            # compute mean of neighbours (axis=0 over [B,G,R])
-            avg = np.mean(vals, axis=0).astype(np.uint8)
-            out[y, x] = avg
-            changed = True
-
-    return out, changed
-
-
 year = 1976
 start_day = 183
 satellite = "32A"
@@ -78,6 +52,9 @@ os.makedirs(nobg_save_folder, exist_ok=True)
 
 model_name = "unet"
 rembg_session = new_session(model_name)
+center_fit = False  # True: subpixel circle fit on a shrunk matte (disk_center.py) instead of the widest row
+matte_cache_dir = None  # e.g. a scratch dir outside the input tree: reruns reuse both mattes per frame
+rembg_matte.set_matte_cache(matte_cache_dir)
 
 
 lower = np.array([lw, lw, lw], dtype=np.uint8)
@@ -116,32 +93,19 @@ for doy in range(start_day, max_day + 1):
                 print(f"Failed to load image {img_path}")
                 continue
 
-            pil = Image.fromarray(cv.cvtColor(img, cv.COLOR_BGR2RGB))
-            rgba = remove(pil, session=rembg_session).convert("RGBA")
-            alpha = np.array(rgba)[:, :, 3]
-
-            widths = (alpha > 0).sum(axis=1)
-            y_max = int(np.argmax(widths))
-            xs = np.where(alpha[y_max] > 0)[0]
-            runs = []
-            start = xs[0]
-            prev = xs[0]
-            for x in xs[1:]:
-                if x == prev + 1:
-                    prev = x
-                else:
-                    runs.append((start, prev))
-                    start = prev = x
-            runs.append((start, prev))
-            x_start = x_end = None
-            for a, b in runs:
-                if (b - a + 1) >= 10:
-                    x_start, x_end = a, b
-                    break
-            if x_start is None:
-                # fallback: just use the full span
-                x_start, x_end = int(xs.min()), int(xs.max())
-            x_center = (x_start + x_end) // 2
+            alpha = rembg_matte.disk_alpha(img, rembg_session)
+
+            center = None
+            if center_fit:
+                cx, cy, _ = disk_center.fit_disks(disk_center.shrink(alpha), alpha.shape)
+                if np.isfinite(cx[0]) and np.isfinite(cy[0]):
+                    center = int(round(cx[0])), int(round(cy[0]))
+            if center is None:  # no fit asked for, or too few chords to fit
+                center = disk_center.row_center(alpha)
+            if center is None:
+                print(f"No disk found in {img_path}")
+                continue
+            x_center, y_max = center
 
 
 
@@ -183,9 +147,8 @@ for doy in range(start_day, max_day + 1):
             out_path = os.path.join(save_folder, file_base + f".vi.med.shift.brush{brush_size}.low{lw}.png")
             cv.imwrite(out_path, shifted)
 
-            shifted_pil = Image.fromarray(cv.cvtColor(shifted, cv.COLOR_BGR2RGB))
-            nobg_clean_pil = remove(shifted_pil, session=rembg_session).convert("RGB")
-            nobg_clean = cv.cvtColor(np.array(nobg_clean_pil), cv.COLOR_RGB2BGR)
+            nobg_clean = cv.cvtColor(rembg_matte.remove_background(shifted, rembg_session)[:, :, :3],
+                                     cv.COLOR_RGB2BGR)
 
             nobg_out_path = os.path.join(nobg_save_folder, file_base + f".vi.med.shift.brush{brush_size}.low{lw}.nobg.png")
             cv.imwrite(nobg_out_path, nobg_clean)
@@ -3,8 +3,13 @@ import re
 import cv2
 import numpy as np
 from datetime import date, timedelta
-from rembg import remove, new_session
-from PIL import Image
+import rembg_service
+import rembg_matte
+from grid_align import (get_matcher, get_scorer, score_masks, compose_affine,
+                        unalign_matrix, resize_matrix, warp_frame)
+from inpaint_backends import inpaint, apply_matte
+from mask_store import load_mask, dilated_mask, set_cache_dir
+from grid_mask_gen import grid_mask
 
 # --- Configuration ---
 DIR = "/ships22/sds/goes/digitized"
@@ -20,8 +25,14 @@ GRID_MASK_FILES = {
     "0N": os.path.join(DIR, "masks/mask0.0N135.0W.png"),
     "5S": os.path.join(DIR, "masks/mask0.5S135.0W.png"),
 }
+MASK_CACHE_DIR = None  # e.g. os.path.join(DIR, "masks/.cache"): dilations/rotations reused across runs (mask_store.py)
+GENERATE_MASKS = False  # True: render each subpoint's grid with grid_mask_gen.py instead of loading its PNG
+GRID_DISK_RADIUS = 880  # px, Earth limb radius in a FRAME_SIZE frame (generated masks only)
 
 INPAINT_RADIUS = 7
+INPAINT_METHOD = "telea"  # inpaint_backends.py: "telea", "ns", "biharmonic", "shiftmap", "pyinpaint", "green", "green_distance"
+INPAINT_TILE = None  # e.g. 256: inpaint only mask-bearing tiles (inpaint_backends.inpaint_tiled)
+INPAINT_THREADS = 1  # threads for the tiles
 DILATE_PIXELS = 5
 
 OUTPUT_ROOT = os.path.join(
@@ -32,7 +43,7 @@ OS_FOLDERS = {
     "video_no_bg_with_grid": os.path.join(OUTPUT_ROOT, f"{YEAR}_vid_nobg_with_grid.mp4"),
     "video_no_bg_inpainted": os.path.join(
         OUTPUT_ROOT,
-        f"{YEAR}_vid_nobg_telea_r{INPAINT_RADIUS}_d{DILATE_PIXELS}.mp4",
+        f"{YEAR}_vid_nobg_{INPAINT_METHOD}_r{INPAINT_RADIUS}_d{DILATE_PIXELS}.mp4",
     ),
     "folder_aligned_with_grid": os.path.join(OUTPUT_ROOT, "aligned_with_grid"),
     "folder_aligned_green": os.path.join(OUTPUT_ROOT, "aligned_green_grid"),
@@ -48,7 +59,12 @@ DEBUG_ROOT = OS_FOLDERS["debug"]
 
 GREEN = np.array((0, 255, 0), dtype=np.uint8)
 USE_REMBG = True
-REMBG_SESSION = new_session("unet")
+REMBG_SERVICE = None  # e.g. rembg_service.ADDRESS: share one model with other runs (rembg_service.py)
+REMBG_SESSION = rembg_service.session("unet", REMBG_SERVICE)
+REMBG_SCALE = 1.0  # run rembg on a copy this size, upsample the matte (rembg_matte.py)
+REMBG_REFINE = False  # re-threshold the upsampled matte's edge at full resolution
+MATTE_METHOD = "rembg"  # "geometric": fit the limb ellipse (disk_segment.py), rembg only if the fit is poor
+MATTE_CACHE_DIR = None  # e.g. os.path.join(OUTPUT_ROOT, ".matte_cache"): reuse mattes of identical frames across runs
 
 FRAME_SIZE = (2000, 2000)
 FPS = 10
@@ -59,21 +75,15 @@ BRIGHT_THRESH = 180
 MAX_ANGLE = 2.2
 ANGLE_STEP = 0.1
 MAX_SHIFT = 200
+ALIGN_MODE = "sweep"  # "sweep" (loop below), or grid_align.py "fft" / "fourier_mellin" / "pyramid"
+# "fft" caches ~0.9 GB per mask (rotated sweep + spectra, mask_store.py) in every
+# process; mask_store.MAX_SWEEPS of them stay resident, so with several subpoint
+# masks the others are rebuilt (or re-mapped from MASK_CACHE_DIR) when they come back
+TRACK_FRAMES = False  # seed each frame from the previous one; full search only on low score (unvalidated, opt-in)
+SPARSE_SCORING = False  # score candidates from the mask pixel list (grid_align.SparseGridScorer); shifts still use full-frame phase correlation
 
 # --- Helper functions ---
 
-def load_mask(path):
-    rgba = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-    if rgba is None:
-        raise FileNotFoundError(f"Could not load grid mask at '{path}'")
-    if rgba.shape[2] == 4:
-        alpha = rgba[:, :, 3]
-        mask = np.where(alpha > 0, 255, 0).astype(np.uint8)
-    else:
-        gray = cv2.cvtColor(rgba, cv2.COLOR_BGR2GRAY)
-        _, mask = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-    return mask
-
 def threshold_satellite(img_bgr, thresh, crop_top_frac=1/12):
     gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, thresh, 255, cv2.THRESH_BINARY)
@@ -100,22 +110,6 @@ def clamp_shift(dx, dy, max_shift):
     dy_c = max(-max_shift, min(max_shift, dy))
     return dx_c, dy_c
 
-def alignment_score(img_bgr, grid_mask):
-    sat_thresh, y_off = threshold_satellite(img_bgr, BRIGHT_THRESH, crop_top_frac=1/12)
-    sat_f = sat_thresh.astype(np.float32)
-    best = -1
-    for theta in np.arange(-MAX_ANGLE, MAX_ANGLE + 1e-5, ANGLE_STEP):
-        rot = rotate_image(grid_mask, theta, interp=cv2.INTER_NEAREST)
-        crop = rot[y_off:, :]
-        dx, dy = phase_correlation_shift(crop.astype(np.float32), sat_f)
-        dx, dy = clamp_shift(dx, dy, MAX_SHIFT)
-        aligned = translate_image(rot, dx, dy, interp=cv2.INTER_NEAREST)
-        aligned_crop = aligned[y_off:, :]
-        overlap = cv2.countNonZero(cv2.bitwise_and(aligned_crop, sat_thresh))
-        if overlap > best:
-            best = overlap
-    return best
-
 def match_grid_to_satellite(sat_thresh, grid_mask, frame_name, y_off):
     best_score = -1
     best_params = (0.0, 0.0, 0.0)
@@ -124,25 +118,51 @@ def match_grid_to_satellite(sat_thresh, grid_mask, frame_name, y_off):
         dbg_dir = os.path.join(DEBUG_ROOT, frame_name)
         os.makedirs(dbg_dir, exist_ok=True)
         cv2.imwrite(os.path.join(dbg_dir, "sat_thresh_cropped.png"), sat_thresh)
+    if ALIGN_MODE != "sweep":
+        matcher = get_matcher(grid_mask, ALIGN_MODE, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT,
+                              track=TRACK_FRAMES, sparse=SPARSE_SCORING)
+        return matcher.match(sat_thresh, y_off)
 
     for theta in np.arange(-MAX_ANGLE, MAX_ANGLE + 1e-5, ANGLE_STEP):
         rot_mask = rotate_image(grid_mask, theta, interp=cv2.INTER_NEAREST)
         crop_mask = rot_mask[y_off:, :]
         dx, dy = phase_correlation_shift(crop_mask.astype(np.float32), sat_f)
         dx, dy = clamp_shift(dx, dy, MAX_SHIFT)
-        aligned_mask = translate_image(rot_mask, dx, dy, interp=cv2.INTER_NEAREST)
-        aligned_crop = aligned_mask[y_off:, :]
-        overlap = cv2.countNonZero(cv2.bitwise_and(aligned_crop, sat_thresh))
+        if SPARSE_SCORING:
+            overlap = get_scorer(grid_mask).score(sat_thresh, theta, dx, dy, y_off)
+        else:
+            aligned_mask = translate_image(rot_mask, dx, dy, interp=cv2.INTER_NEAREST)
+            aligned_crop = aligned_mask[y_off:, :]
+            overlap = cv2.countNonZero(cv2.bitwise_and(aligned_crop, sat_thresh))
         if overlap > best_score:
             best_score = overlap
             best_params = (theta, dx, dy)
 
     return (*best_params, best_score)
 
+def classify_subpoint(sat_thresh, y_off, frame_name):
+    """
+    Aligns every GRID_MASKS entry against one frame and returns
+    (sub, (θ, dx, dy, score)) for the best-scoring mask.  Outside "sweep"
+    mode all masks share one frame spectrum (grid_align.score_masks) and the
+    winner's alignment is used as-is, without a second search.
+    """
+    if ALIGN_MODE == "sweep":
+        results = {k: match_grid_to_satellite(sat_thresh, m, frame_name, y_off)
+                   for k, m in GRID_MASKS.items()}
+    else:
+        matchers = {k: get_matcher(m, ALIGN_MODE, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT,
+                                   sparse=SPARSE_SCORING)
+                    for k, m in GRID_MASKS.items()}
+        results = score_masks(matchers, sat_thresh, y_off)
+    sub = max(results, key=lambda k: results[k][3])
+    if TRACK_FRAMES and ALIGN_MODE != "sweep":
+        get_matcher(GRID_MASKS[sub], ALIGN_MODE, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT,
+                    track=True, sparse=SPARSE_SCORING).seed(results[sub])
+    return sub, results[sub]
+
 def remove_background(img_bgr):
-    pil = Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
-    rem = remove(pil, session=REMBG_SESSION).convert("RGBA")
-    return np.array(rem)
+    return rembg_matte.remove_background(img_bgr, REMBG_SESSION, REMBG_SCALE, REMBG_REFINE, MATTE_METHOD)
 
 import json
 
@@ -194,7 +214,12 @@ def doy_folder(year, doy):
     return (date(year, 1, 1) + timedelta(days=doy-1)).strftime("%Y_%m_%d") + f"_{doy:03d}"
 
 # Preload masks
-GRID_MASKS = {k: load_mask(p) for k, p in GRID_MASK_FILES.items()}
+set_cache_dir(MASK_CACHE_DIR)
+rembg_matte.set_matte_cache(MATTE_CACHE_DIR)
+if GENERATE_MASKS:
+    GRID_MASKS = {k: grid_mask(k, FRAME_SIZE, disk_radius=GRID_DISK_RADIUS) for k in GRID_MASK_FILES}
+else:
+    GRID_MASKS = {k: load_mask(p) for k, p in GRID_MASK_FILES.items()}
 
 # Video writers and output folders
 for k, p in OS_FOLDERS.items():
@@ -242,49 +267,52 @@ for doy in range(START_DAY, last_doy + 1):
             continue
 
         sub = read_subpoint(json_path)
-        if sub is None:
-            print(f"ERROR AT {fname}, NO SUBPOINT FOUND")
-            scores = {k: alignment_score(sat_bgr, m) for k, m in GRID_MASKS.items()}
-            sub = max(scores, key=scores.get)
-        grid_mask = GRID_MASKS[sub]
 
         # Background removal
         if USE_REMBG:
             rgba = remove_background(sat_bgr)
             sat_nobg = cv2.cvtColor(rgba, cv2.COLOR_RGBA2RGB)
+            alpha = rgba[:, :, 3]
         else:
             sat_nobg = sat_bgr.copy()
+            alpha = None
 
-        # Align to grid
+        # Align to grid (unknown subpoint: pick the mask while aligning)
         sat_thresh, y_off = threshold_satellite(sat_nobg, BRIGHT_THRESH, crop_top_frac=1 / 12)
-        theta, dx, dy, score = match_grid_to_satellite(sat_thresh, grid_mask, basefn, y_off)
-
-        sat_trans_bgr = translate_image(sat_bgr, -dx, -dy)
-        aligned_bgr = rotate_image(sat_trans_bgr, -theta)
-        sat_trans_nobg = translate_image(sat_nobg, -dx, -dy)
-        aligned_nobg = rotate_image(sat_trans_nobg, -theta)
+        if sub is None:
+            print(f"ERROR AT {fname}, NO SUBPOINT FOUND")
+            sub, (theta, dx, dy, score) = classify_subpoint(sat_thresh, y_off, basefn)
+        else:
+            theta, dx, dy, score = match_grid_to_satellite(sat_thresh, GRID_MASKS[sub], basefn, y_off)
+        grid_mask = GRID_MASKS[sub]
 
-        if aligned_bgr.shape[1::-1] != FRAME_SIZE:
-            aligned_bgr = cv2.resize(aligned_bgr, FRAME_SIZE)
-            aligned_nobg = cv2.resize(aligned_nobg, FRAME_SIZE)
+        # Undo translate+rotate (and any resize to FRAME_SIZE) as one warp per buffer
+        M = unalign_matrix(theta, dx, dy, sat_bgr.shape)
+        if sat_bgr.shape[1::-1] != FRAME_SIZE:
+            M = compose_affine(M, resize_matrix(sat_bgr.shape, FRAME_SIZE))
+        aligned_bgr = warp_frame(sat_bgr, M, FRAME_SIZE)
+        # No‐background copies are the aligned frame under the aligned matte, so
+        # the frame is inpainted once and the matte applied to the result
+        aligned_alpha = warp_frame(alpha, M, FRAME_SIZE) if alpha is not None else None
+        aligned_nobg = apply_matte(aligned_bgr, aligned_alpha, rgb=USE_REMBG)
 
         out_with_grid = os.path.join(OS_FOLDERS["folder_aligned_with_grid"], basefn + ".png")
         cv2.imwrite(out_with_grid, aligned_bgr)
         vid_with_grid.write(aligned_nobg)
 
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (DILATE_PIXELS, DILATE_PIXELS))
-        thick_mask = cv2.dilate(grid_mask, kernel, iterations=1)
+        thick_mask = dilated_mask(grid_mask, DILATE_PIXELS)
         aligned_green = aligned_bgr.copy()
         aligned_green[thick_mask > 0] = (0, 255, 0)
         out_green = os.path.join(OS_FOLDERS["folder_aligned_green"], basefn + ".png")
         cv2.imwrite(out_green, aligned_green)
 
         telea_mask = thick_mask
-        filled = cv2.inpaint(aligned_bgr, telea_mask, INPAINT_RADIUS, flags=cv2.INPAINT_TELEA)
+        filled = inpaint(aligned_bgr, telea_mask, INPAINT_METHOD, INPAINT_RADIUS,
+                         tile=INPAINT_TILE, workers=INPAINT_THREADS)
         out_no_grid = os.path.join(OS_FOLDERS["folder_aligned_no_grid"], basefn + ".png")
         cv2.imwrite(out_no_grid, filled)
 
-        filled_nobg = cv2.inpaint(aligned_nobg, telea_mask, INPAINT_RADIUS, flags=cv2.INPAINT_TELEA)
+        filled_nobg = apply_matte(filled, aligned_alpha, rgb=USE_REMBG)
         vid_inpaint.write(filled_nobg)
         out_no_grid_nobg = os.path.join(OS_FOLDERS["folder_aligned_no_grid_bg"], basefn + ".png")
         cv2.imwrite(out_no_grid_nobg, filled_nobg)
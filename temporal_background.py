@@ -0,0 +1,163 @@
+import os
+import glob
+import time
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   Cloud‐free background per subpoint from our own aligned frames: a
+#   per‐pixel temporal low percentile (or median) over a season, computed in
+#   one pass without holding the stack.  Clouds are the bright outliers, so a
+#   low quantile (QUANTILE ≈ 0.2) of each pixel over time is the ground.
+#
+#   Two estimators, same interface (add(frame), result()):
+#     • HistogramQuantile — per‐pixel, per‐channel histogram of the 8‐bit
+#       values in `bins` bins (uint16 counts), quantile read off the
+#       cumulative counts and interpolated inside its bin.  Exact to the bin
+#       width; memory H·W·C·bins·2 bytes (2000² BGR, 32 bins: 768 MB).
+#     • FrugalQuantile — Frugal‐2U sketch (Ma, Muthukrishnan & Sandler): two
+#       floats and a sign per pixel and channel that random‐walk towards the
+#       quantile, ~9 bytes each (2000² BGR: 108 MB).  Approximate; wants
+#       hundreds of frames to settle.
+#
+#   fake_color.py uses this in place of marble135w.png (BACKGROUND = "median").
+#   Run directly to write one background PNG from INPUT_DIR.
+# ───────────────────────────────────────────────────────────────────────────────
+
+INPUT_DIR = "/ships22/sds/goes/digitized/32A/vissr/1977/grid_aligned/aligned_output_vi_2/aligned_no_grid_nobg"
+GLOB_PATTERN = "*.png"
+OUT_FILE = os.path.join(INPUT_DIR, "background_q20.png")
+QUANTILE = 0.2           # 0.5 = median; lower drops more cloud
+METHOD = "histogram"     # "histogram" or "frugal"
+HIST_BINS = 32           # 256 / bins gray levels per bin
+FRUGAL_SEED = 0
+
+
+class HistogramQuantile:
+    """Per‐pixel quantile from 8‐bit histograms with `bins` bins."""
+
+    def __init__(self, shape, q, bins=HIST_BINS):
+        if 256 % bins:
+            raise ValueError("bins must divide 256")
+        self.shape = shape          # (H, W) or (H, W, C)
+        self.q = q
+        self.bins = bins
+        self.width = 256 // bins
+        self.n = 0
+        size = int(np.prod(shape))
+        self.counts = np.zeros((size, bins), np.uint16)   # ≤ 65535 frames
+        self._base = np.arange(size, dtype=np.int64) * bins
+
+    def add(self, frame):
+        if self.n == np.iinfo(np.uint16).max:
+            raise OverflowError("HistogramQuantile holds at most 65535 frames")
+        idx = self._base + frame.reshape(-1) // self.width
+        # one increment per pixel: indices are distinct, so no np.add.at needed
+        self.counts.reshape(-1)[idx] += 1
+        self.n += 1
+
+    def result(self, q=None, chunk=1 << 18):
+        """Quantile q (default: self.q) per pixel as uint8, shape self.shape."""
+        q = self.q if q is None else q
+        target = q * (self.n - 1) + 1     # 1‐based rank, as np.quantile's linear
+        out = np.empty(len(self.counts), np.uint8)
+        for s in range(0, len(self.counts), chunk):
+            c = self.counts[s:s + chunk].astype(np.int32)
+            cum = np.cumsum(c, axis=1)
+            b = np.minimum((cum < target).sum(axis=1), self.bins - 1)
+            rows = np.arange(len(c))
+            before = np.where(b > 0, cum[rows, np.maximum(b - 1, 0)], 0)
+            inside = np.maximum(c[rows, b], 1)
+            # place the rank uniformly inside its bin
+            frac = np.clip((target - before - 0.5) / inside, 0.0, 1.0)
+            out[s:s + chunk] = np.clip(b * self.width + frac * self.width, 0, 255)
+        return out.reshape(self.shape)
+
+
+class FrugalQuantile:
+    """Per‐pixel Frugal‐2U quantile sketch."""
+
+    def __init__(self, shape, q, seed=FRUGAL_SEED):
+        self.shape = shape
+        self.q = q
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+        self.m = None
+        self.step = np.ones(shape, np.float32)
+        self.sign = np.ones(shape, np.int8)
+
+    def add(self, frame):
+        s = frame.astype(np.float32)
+        self.n += 1
+        if self.m is None:
+            self.m = s.copy()
+            return
+        m, step, sign = self.m, self.step, self.sign
+        r = self.rng.random(self.shape, dtype=np.float32)
+        up = (s > m) & (r > 1.0 - self.q)
+        down = (s < m) & (r > self.q)
+
+        for sel, d in ((up, 1), (down, -1)):
+            st = step[sel] + np.where(sign[sel] == d, 1.0, -1.0)
+            mv = m[sel] + d * np.where(st > 0, np.ceil(st), 1.0)
+            # don't overshoot the sample: clamp and give the excess back
+            sv = s[sel]
+            past = (mv - sv) * d > 0
+            st[past] -= (mv[past] - sv[past]) * d
+            mv[past] = sv[past]
+            # direction changed: restart the step
+            st[(sign[sel] != d) & (st > 1)] = 1.0
+            m[sel], step[sel], sign[sel] = mv, st, d
+
+    def result(self, q=None):
+        if q is not None and q != self.q:
+            raise ValueError("FrugalQuantile tracks one quantile, set at construction")
+        return np.clip(np.rint(self.m), 0, 255).astype(np.uint8)
+
+
+ESTIMATORS = {
+    "histogram": HistogramQuantile,
+    "frugal": FrugalQuantile,
+}
+
+
+def build_background(paths, q=QUANTILE, method=METHOD, size=None, log=True):
+    """
+    One pass over paths → per‐pixel quantile q of the BGR frames (uint8).
+    size = (w, h) resizes frames that don't match; otherwise the first
+    readable frame sets it.
+    """
+    est = None
+    t0 = time.perf_counter()
+    for p in paths:
+        img = cv2.imread(p, cv2.IMREAD_COLOR)
+        if img is None:
+            if log:
+                print(f"Skipping unreadable file: {os.path.basename(p)}")
+            continue
+        if size is None:
+            size = img.shape[1::-1]
+        if img.shape[1::-1] != tuple(size):
+            img = cv2.resize(img, tuple(size), interpolation=cv2.INTER_AREA)
+        if est is None:
+            est = ESTIMATORS[method](img.shape, q)
+        est.add(img)
+    if est is None:
+        raise RuntimeError("No readable frames for the background")
+    if log:
+        print(f"Background: q={q} over {est.n} frames ({method}) in {time.perf_counter() - t0:.1f} s")
+    return est.result()
+
+
+def main():
+    paths = sorted(glob.glob(os.path.join(INPUT_DIR, GLOB_PATTERN)))
+    paths = [p for p in paths if os.path.abspath(p) != os.path.abspath(OUT_FILE)]
+    if not paths:
+        raise RuntimeError(f"No images found in {INPUT_DIR} matching {GLOB_PATTERN}")
+    bg = build_background(paths, QUANTILE, METHOD)
+    cv2.imwrite(OUT_FILE, bg)
+    print(f"Saved {OUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+from grid_align import (FourierMellinMatcher, PyramidMatcher, clamp_shift, overlap_score, phase_correlate,
+                        rotate_image, theta_range, translate_image)
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   PyramidMatcher and FourierMellinMatcher against the scripts' plain θ
+#   sweep on noisy synthetic frames, with crop offsets that aren't a
+#   multiple of the pyramid factor.
+#   Run with pytest, or directly.
+# ───────────────────────────────────────────────────────────────────────────────
+
+MAX_ANGLE, ANGLE_STEP, MAX_SHIFT = 2.2, 0.1, 200
+
+
+def _grid(size=2000, step=150, thick=2):
+    m = np.zeros((size, size), np.uint8)
+    for x in range(30, size, step):
+        m[:, x:x + thick] = 255
+    for y in range(25, size, step + 7):
+        m[y:y + thick, :] = 255
+    cv2.circle(m, (size // 2, size // 2), size // 2 - 100, 255, 2)
+    return m
+
+
+def _frame(mask, theta, dx, dy, y_off, seed=0, salt=0.003):
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur((rng.random(mask.shape) * 120).astype(np.uint8), (0, 0), 5)
+    m = translate_image(rotate_image(mask, theta, cv2.INTER_NEAREST), dx, dy, cv2.INTER_NEAREST)
+    img[m > 0] = 230
+    img[rng.random(mask.shape) < salt] = 255
+    _, b = cv2.threshold(img, 180, 255, cv2.THRESH_BINARY)
+    return b[y_off:]
+
+
+def _sweep(sat_thresh, grid_mask, y_off):
+    best = (0.0, 0.0, 0.0, -1)
+    sat_f = sat_thresh.astype(np.float32)
+    for theta in theta_range(MAX_ANGLE, ANGLE_STEP):
+        rot = rotate_image(grid_mask, theta, interp=cv2.INTER_NEAREST)
+        dx, dy = clamp_shift(*phase_correlate(rot[y_off:], sat_f), MAX_SHIFT)
+        score = overlap_score(rot, dx, dy, sat_thresh, y_off)
+        if score > best[3]:
+            best = (float(theta), dx, dy, score)
+    return best
+
+
+def test_pyramid_matches_sweep_on_noisy_frames():
+    grid = _grid()
+    for levels in (2, 3):
+        matcher = PyramidMatcher(grid, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT, levels=levels)
+        for (theta, dx, dy), y_off in [((0.7, 12.0, -7.0), 166), ((-1.3, -40.0, 33.0), 167),
+                                       ((1.9, 25.0, -30.0), 163)]:
+            sat = _frame(grid, theta, dx, dy, y_off, seed=levels)
+            # the coarse shift is unbiased by the crop (y_off // f used to put it up to f px off)
+            _, dx_c, dy_c = matcher._coarse(sat, y_off)
+            assert abs(dx_c - dx) <= matcher.factor / 2 and abs(dy_c - dy) <= matcher.factor / 2, \
+                (levels, y_off, dx_c, dy_c)
+            got = matcher.match(sat, y_off)
+            ref = _sweep(sat, grid, y_off)
+            assert abs(got[0] - ref[0]) < 1e-6, (levels, got, ref)
+            assert got[3] >= ref[3], (levels, got, ref)
+            assert abs(got[2] - dy) < 1.0 and abs(got[1] - dx) < 1.0, (levels, got)
+
+
+def test_fourier_mellin_refines_on_sweep_grid():
+    grid = _grid()
+    matcher = FourierMellinMatcher(grid, MAX_ANGLE, ANGLE_STEP, MAX_SHIFT)
+    sweep_thetas = theta_range(MAX_ANGLE, ANGLE_STEP).tolist()
+    sat = _frame(grid, 1.93, 12.0, -9.0, 166)    # estimate lands between grid steps
+    got = matcher.match(sat, 166)
+    ref = _sweep(sat, grid, 166)
+    assert got[0] in sweep_thetas, got
+    assert got[0] == ref[0] and got[3] == ref[3], (got, ref)
+
+
+if __name__ == "__main__":
+    test_pyramid_matches_sweep_on_noisy_frames()
+    test_fourier_mellin_refines_on_sweep_grid()
+    print("ok")
@@ -0,0 +1,68 @@
+import numpy as np
+import rembg
+from rembg.sessions.u2net import U2netSession
+import rembg_service
+
+# ───────────────────────────────────────────────────────────────────────────────
+#   rembg_service batching checks, without downloading a model: new_session
+#   is swapped for one that hands back a U2netSession (what rembg resolves
+#   "unet" to) around a stand‐in ONNX session with a dynamic batch axis.
+#   Run with pytest, or directly.
+# ───────────────────────────────────────────────────────────────────────────────
+
+
+class _Input:
+    name = "input.1"
+    shape = ["batch", 3, 320, 320]
+
+
+class _Inner:
+    def __init__(self):
+        self.batches = []
+
+    def get_inputs(self):
+        return [_Input()]
+
+    def run(self, _, feed):
+        x = feed[_Input.name]
+        self.batches.append(len(x))
+        return [x.mean(axis=1, keepdims=True)]
+
+
+def _fake_new_session(model_name, *args, **kwargs):
+    sess = object.__new__(U2netSession)
+    sess.model_name = model_name
+    sess.inner_session = _Inner()
+    return sess
+
+
+def _server(model):
+    real = rembg.new_session
+    rembg.new_session = _fake_new_session
+    try:
+        return rembg_service.MatteServer(model)
+    finally:
+        rembg.new_session = real
+
+
+def test_unet_server_batches():
+    server = _server("unet")
+    assert server.batch_input is not None
+
+
+def test_batch_matches_single():
+    server = _server("unet")
+    rng = np.random.default_rng(0)
+    imgs = [rng.integers(0, 256, (200, 240, 3), dtype=np.uint8) for _ in range(3)]
+    batched = rembg_service.predict_batch(server.sess, imgs, server.batch_input)
+    single = rembg_service.predict_batch(server.sess, imgs, None)
+    assert server.sess.inner_session.batches == [3, 1, 1, 1]
+    for a, b in zip(batched, single):
+        assert a.shape == (200, 240)
+        assert np.array_equal(a, b)
+
+
+if __name__ == "__main__":
+    test_unet_server_batches()
+    test_batch_matches_single()
+    print("ok")
@@ -2,6 +2,7 @@ import cv2
 import numpy as np
 import glob
 import os
+from green_fill import green_fill
 
 # ───────────────────────────────────────────────────────────────────────────────
 #                          U S E R   CONFIGURATION
@@ -15,6 +16,7 @@ ANGLE_STEP      = 0.1                      # Step size in degrees
 MAX_SHIFT       = 200                      # ± pixels to allow for translation
 INPAINT_RADIUS  = 6                        # (Unused—now using recursive fill)
 RECENTER_DISK   = False                    # Whether to recenter Earth disk
+GREEN_FILL_MODE = "iterative"              # green_fill.py: "iterative" or "distance" (single pass)
 SAVE_DEBUG      = True                     # Whether to save intermediate debug images
 SAVE_DEBUG_FULL = False                    # save rotation images
 thickness = 1                              # How much to dialte mask
@@ -159,44 +161,6 @@ def match_grid_to_satellite(sat_thresh_full, grid_mask, frame_name):
 # ======================================================
 GREEN = np.array((0, 255, 0), dtype=np.uint8)
 
-def fill_green_once(img, green_mask):
-    h, w = green_mask.shape
-    out = img.copy()
-    changed = False
-
-    # 8‐neighbour offsets
-    neigh = [(-1, 0), (+1, 0), (0, -1), (0, +1), (-1, -1), (-1, +1), (+1, -1), (+1, +1)]
-
-    ys, xs = np.where(green_mask)
-    for (y, x) in zip(ys, xs):
-        vals = []
-        for dy, dx in neigh:
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w:
-                if not green_mask[ny, nx]:
-                    vals.append(img[ny, nx])
-        if vals:
-            avg = np.mean(vals, axis=0).astype(np.uint8)
-            out[y, x] = avg
-            changed = True
-
-    return out, changed
-
-def recursive_green_fill(img):
-    """
-    Iteratively replace pure GREEN pixels with the average of neighbouring non‐green pixels
-    until no pure‐green remains or no change occurs.
-    """
-    while True:
-        green_mask = np.all(img == GREEN, axis=2)
-        if not green_mask.any():
-            break
-        img, changed = fill_green_once(img, green_mask)
-        if not changed:
-            break
-    return img
-
-
 # ======================================================
 # Main alignment + recursive fill pipeline
 # ======================================================
@@ -246,7 +210,7 @@ def align_and_fill_frame(path, grid_mask):
         cv2.imwrite(os.path.join(debug_subdir, "green_marked.png"), marked)
 
     # Step 6: run recursive green‐fill inpainting
-    final_img = recursive_green_fill(marked)
+    final_img = green_fill(marked, GREEN_FILL_MODE)
 
     return final_img, (theta, dx, dy, tx, ty, score)
 